@@ -0,0 +1,143 @@
+"""Offline end-to-end latency benchmark: /api/launch -> agents -> synthesis -> lab summaries.
+
+Runs the real backend in-process against local fakes (see fakes.py), so no
+tokens are spent and no public API is hit. Reports critical-path time,
+per-agent time, LLM and upstream call counts and peak Python memory.
+
+    cd backend && python -m bench.e2e --llm-latency 0.5 --upstream-latency 0.1
+    cd backend && python -m bench.e2e --full --json bench_e2e.json
+    cd backend && python -m bench.e2e --hang www.ebi.ac.uk --hang-seconds 30
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import main  # noqa: E402
+from bench.fakes import LocalServer, UpstreamRouter, make_fake_anthropic, make_fake_upstreams  # noqa: E402
+
+
+def mcp_tools_by_server() -> dict[str, list[str]]:
+    tools: dict[str, list[str]] = {}
+    for names in main.MCP_TOOLS_PER_AGENT.values():
+        for namespaced in names:
+            namespace, tool = namespaced.split("__", 1)
+            tools.setdefault(namespace, [])
+            if tool not in tools[namespace]:
+                tools[namespace].append(tool)
+    return tools
+
+
+async def run_mission(args, router: UpstreamRouter) -> dict:
+    main.http_client = httpx.AsyncClient(transport=main.BreakerTransport(router), timeout=60.0)
+    await main.discover_all_tools()
+
+    agent_times: dict[str, float] = {}
+    run_agent_loop = main.run_agent_loop
+
+    async def timed_agent_loop(agent_name, *a, **kw):
+        start = time.perf_counter()
+        try:
+            return await run_agent_loop(agent_name, *a, **kw)
+        finally:
+            agent_times[agent_name] = time.perf_counter() - start
+
+    main.run_agent_loop = timed_agent_loop
+    router.counts.clear()
+    tool_calls_before = dict(main.tool_call_stats)
+    tracemalloc.start()
+    try:
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://beacon", timeout=60.0) as api:
+            start = time.perf_counter()
+            r = await api.post("/api/launch", json={"disease": args.disease, "demo": not args.full, "token": main.BEACON_TOKEN})
+            r.raise_for_status()
+            deadline = start + args.timeout
+            while True:
+                state = (await api.get("/api/state")).json()
+                if state.get("mission", {}).get("stage") == "roadmap":
+                    break
+                if time.perf_counter() > deadline:
+                    raise TimeoutError(f"mission did not reach roadmap within {args.timeout}s")
+                await asyncio.sleep(args.poll_interval)
+            total = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        main.run_agent_loop = run_agent_loop
+
+    agents_phase = max(agent_times.values()) if agent_times else 0.0
+    return {
+        "critical_path_s": round(total, 3),
+        "agents_phase_s": round(agents_phase, 3),
+        "post_agents_s": round(total - agents_phase, 3),
+        "slowest_agent": max(agent_times, key=agent_times.get) if agent_times else None,
+        "agent_s": {k: round(v, 3) for k, v in sorted(agent_times.items())},
+        "upstream_calls": dict(sorted(router.counts.items())),
+        "tool_calls": {k: v - tool_calls_before.get(k, 0) for k, v in main.tool_call_stats.items()},
+        "open_circuits": sorted(name for name, b in main.breakers.items() if b.state != "closed"),
+        "model_cascade": main.cascade_rates(),
+        "peak_memory_mb": round(peak / 1e6, 2),
+        "tool_turns": args.tool_turns,
+    }
+
+
+async def run_missions(args, router: UpstreamRouter, llm) -> list[dict]:
+    # One event loop for every run: the backend's module-level locks bind to it
+    results = []
+    for i in range(args.runs):
+        calls_before = llm.state.calls
+        result = await run_mission(args, router)
+        result["llm_calls"] = llm.state.calls - calls_before
+        results.append(result)
+        print(json.dumps({"run": i + 1, **result}, indent=2))
+    return results
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--disease", default="CLN3 Batten Disease")
+    parser.add_argument("--full", action="store_true", help="use full ITERATIONS/MODELS instead of demo settings")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="seconds per fake Messages API call")
+    parser.add_argument("--fast-llm-latency", type=float, help="seconds per fake Haiku call (default: --llm-latency)")
+    parser.add_argument("--fast-fail-rate", type=float, default=0.0, help="share of Haiku reports too thin to pass cascade validation")
+    parser.add_argument("--upstream-latency", type=float, default=0.05, help="seconds per fake upstream request")
+    parser.add_argument("--hang", action="append", default=[], metavar="HOST",
+                        help="simulate an outage: requests to HOST stall --hang-seconds then time out (repeatable)")
+    parser.add_argument("--hang-seconds", type=float, default=5.0)
+    parser.add_argument("--tool-turns", type=int, default=2, help="scripted tool_use turns per agent conversation")
+    parser.add_argument("--findings", type=int, default=10, help="records per section in the scripted reports")
+    parser.add_argument("--runs", type=int, default=1)
+    parser.add_argument("--timeout", type=float, default=600.0)
+    parser.add_argument("--poll-interval", type=float, default=0.05)
+    parser.add_argument("--json", help="also write results to this file")
+    parser.add_argument("--trace-dir", default="", help="export backend spans to <mission_id>.jsonl files in this directory")
+    args = parser.parse_args()
+    main.TRACE_DIR = args.trace_dir
+
+    llm = make_fake_anthropic(args.llm_latency, args.tool_turns, args.findings, args.fast_llm_latency, args.fast_fail_rate)
+    upstreams = make_fake_upstreams(args.upstream_latency, mcp_tools_by_server())
+    with LocalServer(llm) as llm_url, LocalServer(upstreams) as upstream_url:
+        os.environ["ANTHROPIC_BASE_URL"] = llm_url
+        os.environ["ANTHROPIC_API_KEY"] = "sk-ant-bench"
+        router = UpstreamRouter(upstream_url, tuple(args.hang), args.hang_seconds)
+        results = asyncio.run(run_missions(args, router, llm))
+    main.flush_traces()
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,306 @@
+"""Local stand-ins for the Anthropic Messages API and every upstream the backend calls.
+
+Two ASGI apps, both served by uvicorn on loopback during a benchmark:
+
+- fake_anthropic: scripted Messages API. Each agent conversation makes
+  `tool_turns` tool_use turns (cycling through the tools it was offered) and
+  then submits a report that satisfies merge_output for every agent, through
+  submit_report when offered and as JSON text otherwise.
+- fake_upstreams: ClinicalTrials.gov, NCBI E-utilities, ChEMBL, openFDA,
+  Open Targets and the MCP servers, with small deterministic payloads.
+
+UpstreamRouter is an httpx transport that rewrites the real upstream hosts to
+the local fake server and counts calls per original host.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import random
+import threading
+import time
+from urllib.parse import parse_qs
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+UPSTREAM_HOSTS = {
+    "clinicaltrials.gov",
+    "eutils.ncbi.nlm.nih.gov",
+    "www.ebi.ac.uk",
+    "api.fda.gov",
+    "api.platform.opentargets.org",
+    "mcp.deepsense.ai",
+}
+
+
+# ---------------------------------------------------------------------------
+# Fake Messages API
+# ---------------------------------------------------------------------------
+
+def _fill_arguments(schema: dict) -> dict:
+    args = {}
+    for name, prop in (schema.get("properties") or {}).items():
+        if name not in (schema.get("required") or []):
+            continue
+        kind = prop.get("type")
+        if kind == "array":
+            args[name] = ["CLN3", "TPP1", "miglustat"]
+        elif kind == "integer":
+            args[name] = 5
+        elif kind == "boolean":
+            args[name] = False
+        else:
+            args[name] = "NCT00000001" if "nct" in name else "CLN3"
+    return args
+
+
+def fake_report(findings: int) -> dict:
+    """One report with every section merge_output reads, sized by `findings`."""
+    items = range(findings)
+    return {
+        "findings": [{"title": f"Finding {i}", "summary": "Synthetic finding " * 8, "source": f"PMID:{1000 + i}"} for i in items],
+        "knowledgeGraph": {"nodes": [{"id": f"n{i}"} for i in items], "edges": []},
+        "handoffs": [{"to": "chemist", "note": "Check CLN3 modulators"}],
+        "contacts": [{"name": f"Dr. Researcher {i}", "institution": "University", "email_draft": {"subject": "CLN3", "body": "Hello " * 20}} for i in items],
+        "regulatoryPathways": {"orphanDrug": {"status": "eligible", "steps": ["file", "review"]}},
+        "grantOpportunities": [{"name": f"Grant {i}", "amount": "$50K"} for i in items],
+        "fundraisingStrategy": {"phases": []},
+        "weeklyBriefing": {"masterRoadmap": {"phases": [{"name": "Phase 1"}]}, "topPriorities": ["Contact researchers"], "questionsForFamily": []},
+        "targets": [{"gene": f"GENE{i}", "rationale": "Synthetic target " * 6} for i in items],
+        "disease_mechanism": "Lysosomal dysfunction",
+        "repurposing_candidates": [{"name": f"Compound {i}", "chembl_id": f"CHEMBL{i}", "pchembl": 6.5} for i in items],
+        "candidate_ranking": [f"Compound {i}" for i in items],
+        "candidate_evaluations": [{"compound": f"Compound {i}", "admet": "acceptable"} for i in items],
+        "experiment_design": {"model": "iPSC neurons"},
+        "approvalItems": [{"type": "outreach_email", "title": "Email Dr. Researcher 0", "content": {
+            "to": "researcher0@example.org", "subject": "CLN3 collaboration", "body": "Hello Dr. Researcher 0, ..."}}],
+    }
+
+
+def make_fake_anthropic(latency: float, tool_turns: int, findings: int,
+                        fast_latency: float | None = None, fast_fail_rate: float = 0.0) -> FastAPI:
+    """fast_latency / fast_fail_rate apply to Haiku requests: its own latency, and the share of
+    its reports that come back too thin to pass the backend's cascade validation."""
+    app = FastAPI()
+    app.state.calls = 0
+    report, thin_report = fake_report(findings), fake_report(1)
+    rng = random.Random(0)
+
+    @app.post("/v1/messages")
+    async def messages(request: Request):
+        body = await request.json()
+        app.state.calls += 1
+        fast = "haiku" in body.get("model", "")
+        await asyncio.sleep(fast_latency if fast and fast_latency is not None else latency)
+        messages = body.get("messages", [])
+        tools = [t for t in body.get("tools", []) if "input_schema" in t and t["name"] != "submit_report"]
+        can_submit = any(t.get("name") == "submit_report" for t in body.get("tools", []))
+        turns_so_far = sum(1 for m in messages if m["role"] == "assistant")
+        input_tokens = len(json.dumps(body)) // 4
+        tool_choice = body.get("tool_choice", {})
+        tools_allowed = tool_choice.get("type") not in ("none", "tool")
+        if tools and tools_allowed and turns_so_far < tool_turns:
+            tool = tools[turns_so_far % len(tools)]
+            content = [{
+                "type": "tool_use",
+                "id": f"toolu_{app.state.calls:06d}",
+                "name": tool["name"],
+                "input": _fill_arguments(tool["input_schema"]),
+            }]
+            stop_reason = "tool_use"
+        else:
+            final = thin_report if fast and rng.random() < fast_fail_rate else report
+            if can_submit and tool_choice.get("type") != "none":
+                content = [{"type": "tool_use", "id": f"toolu_{app.state.calls:06d}", "name": "submit_report", "input": final}]
+                stop_reason = "tool_use"
+            else:
+                content = [{"type": "text", "text": json.dumps(final)}]
+                stop_reason = "end_turn"
+        return {
+            "id": f"msg_{app.state.calls:06d}",
+            "type": "message",
+            "role": "assistant",
+            "model": body.get("model"),
+            "content": content,
+            "stop_reason": stop_reason,
+            "stop_sequence": None,
+            "usage": {"input_tokens": input_tokens, "output_tokens": len(json.dumps(content)) // 4},
+        }
+
+    return app
+
+
+# ---------------------------------------------------------------------------
+# Fake upstream APIs
+# ---------------------------------------------------------------------------
+
+def _pmids(term: str, n: int) -> list[str]:
+    seed = int(hashlib.sha1(term.encode()).hexdigest()[:6], 16)
+    return [str(seed + i) for i in range(n)]
+
+
+def _study(i: int) -> dict:
+    return {"protocolSection": {
+        "identificationModule": {"nctId": f"NCT{i:08d}", "briefTitle": f"Trial {i}", "officialTitle": f"A Study {i}"},
+        "statusModule": {"overallStatus": "RECRUITING", "startDateStruct": {"date": "2025-01"}},
+        "designModule": {"phases": ["PHASE2"], "studyType": "INTERVENTIONAL", "enrollmentInfo": {"count": 40}},
+        "descriptionModule": {"briefSummary": "Synthetic trial summary. " * 10},
+        "sponsorCollaboratorsModule": {"leadSponsor": {"name": "Sponsor"}},
+        "eligibilityModule": {"eligibilityCriteria": "Inclusion: CLN3. " * 20, "minimumAge": "3 Years"},
+        "contactsLocationsModule": {"locations": [{"facility": "Hospital", "city": "Boston", "country": "US"}]},
+    }}
+
+
+def make_fake_upstreams(latency: float, mcp_tools: dict[str, list[str]]) -> FastAPI:
+    """mcp_tools maps MCP server path segment (e.g. "clinical_trials") to its tool names."""
+    app = FastAPI()
+
+    @app.middleware("http")
+    async def delay(request: Request, call_next):
+        await asyncio.sleep(latency)
+        return await call_next(request)
+
+    async def form(request: Request) -> dict:
+        return {k: v[0] for k, v in parse_qs((await request.body()).decode()).items()}
+
+    @app.get("/api/v2/studies")
+    async def studies(request: Request):
+        n = min(int(request.query_params.get("pageSize", 10)), 50)
+        return {"studies": [_study(i) for i in range(n)]}
+
+    @app.get("/api/v2/studies/{nct_id}")
+    async def study(nct_id: str):
+        return _study(int("".join(c for c in nct_id if c.isdigit()) or 0))
+
+    @app.post("/entrez/eutils/esearch.fcgi")
+    async def esearch(request: Request):
+        params = await form(request)
+        return {"esearchresult": {"idlist": _pmids(params.get("term", ""), int(params.get("retmax", 10))),
+                                  "webenv": "FAKE", "querykey": "1"}}
+
+    @app.post("/entrez/eutils/esummary.fcgi")
+    async def esummary(request: Request):
+        params = await form(request)
+        ids = params["id"].split(",") if params.get("id") else _pmids("history", int(params.get("retmax", 20)))
+        result = {"uids": ids}
+        for pmid in ids:
+            result[pmid] = {"title": f"Article {pmid}", "authors": [{"name": "Smith J"}],
+                            "fulljournalname": "J Rare Dis", "pubdate": "2025", "elocationid": f"doi:10/{pmid}"}
+        return {"result": result}
+
+    @app.post("/entrez/eutils/efetch.fcgi")
+    async def efetch(request: Request):
+        params = await form(request)
+        articles = "".join(
+            f"<PubmedArticle><MedlineCitation><PMID>{pmid}</PMID><Article><Abstract>"
+            f"<AbstractText>Synthetic abstract {pmid}.</AbstractText></Abstract></Article></MedlineCitation></PubmedArticle>"
+            for pmid in params.get("id", "").split(",")
+        )
+        return Response(f"<PubmedArticleSet>{articles}</PubmedArticleSet>", media_type="text/xml")
+
+    @app.get("/chembl/api/data/molecule/search.json")
+    async def molecules(request: Request):
+        q = request.query_params.get("q", "")
+        return {"molecules": [{"molecule_chembl_id": f"CHEMBL{i}", "pref_name": f"{q} analog {i}", "max_phase": 2,
+                               "molecule_type": "Small molecule",
+                               "molecule_properties": {"full_mwt": "300.1", "alogp": "1.2", "hba": 4, "hbd": 2, "psa": "70", "num_ro5_violations": 0}}
+                              for i in range(10)]}
+
+    @app.get("/chembl/api/data/target/search.json")
+    async def targets(request: Request):
+        q = request.query_params.get("q", "")
+        return {"targets": [{"target_chembl_id": f"CHEMBL{900 + i}", "pref_name": f"{q} protein {i}", "target_type": "SINGLE PROTEIN",
+                             "organism": "Homo sapiens",
+                             "target_components": [{"target_component_synonyms": [{"syn_type": "GENE_SYMBOL", "component_synonym": q}]}]}
+                            for i in range(10)]}
+
+    @app.get("/chembl/api/data/activity.json")
+    async def activities(request: Request):
+        n = int(request.query_params.get("limit", 20))
+        return {"activities": [{"molecule_chembl_id": f"CHEMBL{i}", "molecule_pref_name": f"Compound {i}", "standard_type": "IC50",
+                                "standard_value": "120", "standard_units": "nM", "pchembl_value": "6.9"} for i in range(n)]}
+
+    @app.get("/drug/drugsfda.json")
+    async def drugsfda(request: Request):
+        return {"results": [{"openfda": {"brand_name": ["Zavesca"], "generic_name": ["miglustat"]},
+                             "products": [{"brand_name": "Zavesca", "dosage_form": "CAPSULE", "active_ingredients": []}]}]}
+
+    @app.post("/api/v4/graphql")
+    async def graphql(request: Request):
+        body = await request.json()
+        if "search(" in body["query"]:
+            return {"data": {"search": {"hits": [{"id": "MONDO_0000001", "name": body["variables"]["q"]}]}}}
+        size = body["variables"].get("size", 10)
+        rows = [{"target": {"id": f"ENSG{i}", "approvedSymbol": f"GENE{i}", "approvedName": f"Gene {i}"},
+                 "score": 0.5, "datatypeScores": [{"id": "genetic_association", "score": 0.7}]} for i in range(size)]
+        return {"data": {"disease": {"associatedTargets": {"count": size, "rows": rows}}}}
+
+    @app.post("/{server}/mcp")
+    async def mcp(server: str, request: Request):
+        body = await request.json()
+        if body["method"] == "tools/list":
+            tools = [{"name": name, "description": f"Fake {name}",
+                      "inputSchema": {"type": "object", "properties": {"query": {"type": "string"}}, "required": ["query"]}}
+                     for name in mcp_tools.get(server, [])]
+            return {"jsonrpc": "2.0", "id": body.get("id"), "result": {"tools": tools}}
+        text = json.dumps({"results": [{"id": i, "name": f"{server} record {i}"} for i in range(10)]})
+        return {"jsonrpc": "2.0", "id": body.get("id"), "result": {"content": [{"type": "text", "text": text}]}}
+
+    @app.exception_handler(Exception)
+    async def error(request: Request, exc: Exception):
+        return JSONResponse(status_code=500, content={"error": str(exc)})
+
+    return app
+
+
+# ---------------------------------------------------------------------------
+# Serving & routing
+# ---------------------------------------------------------------------------
+
+class LocalServer:
+    """Runs an ASGI app with uvicorn on a loopback port in a background thread."""
+
+    def __init__(self, app: FastAPI):
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning", lifespan="off"))
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def __enter__(self) -> str:
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        port = self.server.servers[0].sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{port}"
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join(timeout=5)
+
+
+class UpstreamRouter(httpx.AsyncHTTPTransport):
+    """Sends requests for known upstream hosts to the local fake server, counting per host.
+
+    Hosts in `hanging` simulate an outage: requests stall for `hang_seconds` and then time out.
+    """
+
+    def __init__(self, fake_url: str, hanging: tuple[str, ...] = (), hang_seconds: float = 5.0):
+        super().__init__()
+        self.fake = httpx.URL(fake_url)
+        self.counts: dict[str, int] = {}
+        self.hanging = set(hanging)
+        self.hang_seconds = hang_seconds
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        self.counts[host] = self.counts.get(host, 0) + 1
+        if host in self.hanging:
+            await asyncio.sleep(self.hang_seconds)
+            raise httpx.ReadTimeout(f"{host} timed out (simulated outage)", request=request)
+        if host in UPSTREAM_HOSTS:
+            request.url = request.url.copy_with(scheme=self.fake.scheme, host=self.fake.host, port=self.fake.port)
+            request.headers["host"] = f"{self.fake.host}:{self.fake.port}"
+        return await super().handle_async_request(request)
@@ -0,0 +1,207 @@
+"""Micro-benchmarks for the backend's pure-Python hot paths over recorded agent outputs.
+
+Corpora are the recorded reports in outputs/reports/*.json (fed to
+merge_output as raw, fenced and prose-wrapped agent text, and as the dict a
+submit_report call delivers) and the recorded
+orchestrator/shared_plan.json (fed to build_prompt and to the snapshot path
+/api/state and /api/plan serve: dumps_bytes, and snapshot() after a publish),
+each at 1x, 10x and 100x list sizes.
+
+    cd backend && python -m bench.micro
+    cd backend && python -m bench.micro --save bench/baselines/micro.json
+    cd backend && python -m bench.micro --compare bench/baselines/micro.json --threshold 1.5
+
+Timings are per call in microseconds: the fastest of --repeat rounds over the
+whole suite, since noise from a shared machine only ever adds time. Baselines
+are machine-specific; regenerate them on the machine you compare against.
+
+--compare flags a benchmark when it is more than --threshold times and
+--min-delta µs slower than baseline, after dividing out the median ratio
+across all benchmarks (a uniformly slower machine is not a regression).
+Flagged benchmarks are measured again before the run fails.
+"""
+
+from __future__ import annotations
+
+import argparse
+import contextlib
+import gc
+import io
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import main  # noqa: E402
+
+ROOT = Path(__file__).resolve().parent.parent.parent
+REPORTS_DIR = ROOT / "outputs" / "reports"
+SHARED_PLAN = ROOT / "orchestrator" / "shared_plan.json"
+SCALES = (1, 10, 100)
+
+
+def scale_lists(obj, factor: int, depth: int = 2):
+    """Repeat every list within `depth` levels of obj `factor` times (findings, contacts, targets...)."""
+    if factor == 1 or depth < 0:
+        return obj
+    if isinstance(obj, dict):
+        return {k: scale_lists(v, factor, depth - 1) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [scale_lists(v, factor, depth - 1) for v in obj] * factor
+    return obj
+
+
+def load_reports() -> dict[str, str]:
+    return {p.name.removesuffix("-report.json"): p.read_text() for p in sorted(REPORTS_DIR.glob("*-report.json"))}
+
+
+def report_variants(raw: str, factor: int) -> dict[str, str]:
+    """The shapes agent text arrives in: bare JSON, fenced JSON, JSON wrapped in prose."""
+    try:
+        text = json.dumps(scale_lists(json.loads(raw), factor), indent=2)
+    except json.JSONDecodeError:
+        text = raw * factor  # prose-only report: exercises the parse-failure path
+        return {"prose": text}
+    return {
+        "bare": text,
+        "fenced": f"```json\n{text}\n```",
+        "wrapped": f"Here is my report.\n\n{text}\n\nLet me know if you need more.",
+    }
+
+
+def calls_per_sample(fn, setup=None) -> int:
+    """How many calls fit in ~20ms."""
+    if setup:
+        setup()
+    start = time.perf_counter()
+    fn()
+    single = max(time.perf_counter() - start, 1e-7)
+    return max(1, int(0.02 / single))
+
+
+def sample(fn, number: int, setup=None) -> float:
+    """Seconds per call over one run of `number` calls, with the garbage collector off (as timeit does)."""
+    if setup:
+        setup()
+    gc.collect()
+    gc.disable()
+    try:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        return (time.perf_counter() - start) / number
+    finally:
+        gc.enable()
+
+
+def reset_state(plan: dict):
+    main.shared_plan = {"mission": plan["mission"], "knowledge": {}, "approvals": [], "log": []}
+    main.app_state = {"mission": plan["mission"], "agents": {}, "approvals": []}
+
+
+def fake_mcp_schemas():
+    for names in main.MCP_TOOLS_PER_AGENT.values():
+        for name in names:
+            main.mcp_tool_schemas[name] = {
+                "name": name,
+                "description": f"{name} " * 20,
+                "input_schema": {"type": "object", "properties": {"query": {"type": "string"}}},
+            }
+
+
+def benchmarks(repeat: int, select=lambda name: True) -> dict[str, float]:
+    plan = json.loads(SHARED_PLAN.read_text())
+    reports = load_reports()
+    fake_mcp_schemas()
+    cases: dict[str, tuple] = {}
+
+    def run(name: str, fn, setup=None):
+        if select(name):
+            cases[name] = (fn, setup, calls_per_sample(fn, setup))
+
+    with contextlib.redirect_stdout(io.StringIO()):  # merge_output prints per call
+        for factor in SCALES:
+            for agent, raw in reports.items():
+                variants = report_variants(raw, factor)
+                for variant, text in variants.items():
+                    run(f"merge_output/{agent}/{variant}/x{factor}",
+                        lambda a=agent, t=text: main.merge_output(a, t), lambda: reset_state(plan))
+                if "bare" in variants:  # submit_report input: already a dict
+                    report = json.loads(variants["bare"])
+                    run(f"merge_output/{agent}/submit_report/x{factor}",
+                        lambda a=agent, r=report: main.merge_output(a, r), lambda: reset_state(plan))
+
+        for factor in SCALES:
+            scaled = {**plan, "knowledge": scale_lists(plan["knowledge"], factor, depth=2)}
+            for agent in main.MODELS:
+                run(f"build_prompt/{agent}/x{factor}", lambda a=agent, p=scaled: main.build_prompt(a, p, 1, 2))
+            run(f"serialize/dumps_bytes/x{factor}", lambda p=scaled: main.dumps_bytes(p))
+            run(f"serialize/snapshot/x{factor}", lambda: (main.publish("plan"), main.snapshot("plan")),
+                lambda p=scaled: setattr(main, "shared_plan", p))
+
+        for agent in main.MODELS:
+            run(f"get_tools_for_agent/{agent}", lambda a=agent: main.get_tools_for_agent(a))
+
+        for agent in ("navigator", "mobilizer"):
+            text = json.dumps(json.loads(reports[agent]), indent=2)
+            run(f"encode_tool_result/{agent}", lambda t=text: main.encode_tool_result(t))
+
+        # Rounds over the whole suite rather than back-to-back repeats, so a slow spell of a shared machine
+        # lands on one sample of many benchmarks instead of every sample of a few
+        samples: dict[str, list[float]] = {name: [] for name in cases}
+        for _ in range(repeat):
+            for name, (fn, setup, number) in cases.items():
+                samples[name].append(sample(fn, number, setup))
+    results = {name: min(times) * 1e6 for name, times in samples.items()}
+    for name, micros in results.items():
+        print(f"  {name:<52} {micros:>12,.1f} µs")
+    return results
+
+
+def compare(results: dict[str, float], baseline: dict[str, float], threshold: float, min_delta: float) -> list[str]:
+    """Names of benchmarks slower than baseline by more than `threshold` and `min_delta` µs, after machine drift."""
+    ratios = {name: now / baseline[name] for name, now in results.items() if baseline.get(name)}
+    drift = max(1.0, statistics.median(ratios.values())) if ratios else 1.0
+    regressions = []
+    print(f"\n  {'benchmark':<52} {'baseline':>10} {'now':>10} {'ratio':>7}")
+    for name, ratio in ratios.items():
+        slower = results[name] - baseline[name] * drift
+        flag = "  REGRESSION" if ratio / drift > threshold and slower > min_delta else ""
+        if flag:
+            regressions.append(name)
+        print(f"  {name:<52} {baseline[name]:>10,.1f} {results[name]:>10,.1f} {ratio:>6.2f}x{flag}")
+    print(f"\n{len(regressions)} regression(s) above {threshold:.2f}x (machine drift {drift:.2f}x factored out)")
+    return regressions
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--only", help="run benchmarks whose name contains this substring")
+    parser.add_argument("--save", help="write results as a baseline JSON file")
+    parser.add_argument("--compare", help="baseline JSON file to compare against")
+    parser.add_argument("--threshold", type=float, default=1.5, help="ratio above baseline that counts as a regression")
+    parser.add_argument("--min-delta", type=float, default=10.0,
+                        help="µs a benchmark must also slow down by to count (timer noise on µs-scale calls)")
+    args = parser.parse_args()
+
+    results = benchmarks(args.repeat, lambda name: not args.only or args.only in name)
+    if args.save:
+        Path(args.save).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.save).write_text(json.dumps({k: round(v, 2) for k, v in results.items()}, indent=1) + "\n")
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        regressions = compare(results, baseline, args.threshold, args.min_delta)
+        if regressions:  # confirm with a second, longer measurement: a slow spell should not fail the run
+            print(f"\nRe-measuring {len(regressions)} flagged benchmark(s)...")
+            rerun = benchmarks(args.repeat * 2, set(regressions).__contains__)
+            results.update({name: min(results[name], micros) for name, micros in rerun.items()})
+            regressions = compare(results, baseline, args.threshold, args.min_delta)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main_cli()
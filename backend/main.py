@@ -3,18 +3,38 @@
 from __future__ import annotations
 
 import asyncio
+import gzip
+import hashlib
+import html
 import json
 import os
+import re
+import sqlite3
+import threading
+import time
 import traceback
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
 from datetime import datetime
+from functools import partial
+from itertools import islice
 from pathlib import Path
+from xml.etree import ElementTree
 
 import anthropic
 import httpx
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 
+try:
+    import orjson
+except ImportError:  # optional: faster JSON, stdlib fallback
+    orjson = None
+
 app = FastAPI(title="Beacon Backend")
 
 app.add_middleware(
@@ -108,11 +128,685 @@ MCP_TOOLS_PER_AGENT = {
     ],
 }
 
+# ---------------------------------------------------------------------------
+# JSON codec & CPU offload
+# ---------------------------------------------------------------------------
+
+CPU_WORKERS = int(os.environ.get("BEACON_CPU_WORKERS", min(4, os.cpu_count() or 1)))
+LOOP_LAG_INTERVAL = 0.5    # seconds between event-loop lag probes
+LOOP_LAG_THRESHOLD = 0.1   # lag above this is reported as a stall
+
+# Bounded pool for parsing, prompt assembly and large dumps, so they don't stall the event loop
+cpu_executor = ThreadPoolExecutor(max_workers=CPU_WORKERS, thread_name_prefix="beacon-cpu")
+
+
+def dumps_bytes(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, default=str, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def dumps_text(obj) -> str:
+    return dumps_bytes(obj).decode()
+
+
+def json_loads(text: str | bytes):
+    # orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers catch either the same way
+    return orjson.loads(text) if orjson is not None else json.loads(text)
+
+
+async def run_cpu(fn, *args):
+    """Run a CPU-bound function on the bounded worker pool."""
+    return await asyncio.get_running_loop().run_in_executor(cpu_executor, partial(fn, *args))
+
+
+loop_lag_stats = {"stalls": 0, "max_lag_ms": 0.0, "last_stall_at": None}
+
+
+async def monitor_event_loop():
+    """Sleep LOOP_LAG_INTERVAL repeatedly; any extra delay is time the loop was blocked."""
+    loop = asyncio.get_running_loop()
+    while True:
+        start = loop.time()
+        await asyncio.sleep(LOOP_LAG_INTERVAL)
+        lag = loop.time() - start - LOOP_LAG_INTERVAL
+        LOOP_LAG_SECONDS.observe(max(lag, 0))
+        loop_lag_stats["max_lag_ms"] = max(loop_lag_stats["max_lag_ms"], round(lag * 1000, 1))
+        if lag > LOOP_LAG_THRESHOLD:
+            loop_lag_stats["stalls"] += 1
+            loop_lag_stats["last_stall_at"] = datetime.now().isoformat()
+            print(f"  🐢 Event loop stalled {lag * 1000:.0f}ms")
+
+
+# ---------------------------------------------------------------------------
+# Metrics (Prometheus text exposition at /api/metrics)
+# ---------------------------------------------------------------------------
+
+metrics_registry: list = []
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+def _label_str(labelnames: tuple, values: tuple, extra: str = "") -> str:
+    def esc(v):
+        return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+    pairs = [f'{k}="{esc(v)}"' for k, v in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self.values: dict[tuple, float] = {}
+        metrics_registry.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(k, "")) for k in self.labelnames)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, value in self.values.items():
+            lines.append(f"{self.name}{_label_str(self.labelnames, key)} {value}")
+        return lines
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        self.values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = buckets
+        self.values: dict[tuple, list] = {}  # key -> [bucket counts..., sum, count]
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        data = self.values.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                data[i] += 1
+        data[-2] += value
+        data[-1] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, data in self.values.items():
+            for bound, count in zip(self.buckets, data):
+                le = _label_str(self.labelnames, key, 'le="%s"' % bound)
+                lines.append(f"{self.name}_bucket{le} {count}")
+            le = _label_str(self.labelnames, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{le} {data[-1]}")
+            lines.append(f"{self.name}_sum{_label_str(self.labelnames, key)} {data[-2]}")
+            lines.append(f"{self.name}_count{_label_str(self.labelnames, key)} {data[-1]}")
+        return lines
+
+
+def render_metrics() -> str:
+    return "\n".join(line for metric in metrics_registry for line in metric.render()) + "\n"
+
+
+TOOL_SECONDS = Histogram("beacon_tool_call_seconds", "Upstream tool call latency", ("tool", "source", "outcome"))
+UPSTREAM_SECONDS = Histogram("beacon_upstream_request_seconds", "HTTP request latency by upstream host", ("host", "status"))
+LLM_SECONDS = Histogram("beacon_llm_call_seconds", "Anthropic Messages API call latency", ("model", "agent"))
+LLM_TOKENS = Counter("beacon_llm_tokens_total", "Tokens used by model and agent", ("model", "agent", "kind"))
+ITERATION_SECONDS = Histogram("beacon_agent_iteration_seconds", "Agent iteration duration", ("agent",))
+PARSE_FAILURES = Counter("beacon_merge_parse_failures_total", "Agent outputs merge_output could not parse", ("agent",))
+LOCK_WAIT_SECONDS = Histogram("beacon_state_lock_wait_seconds", "Time spent waiting for state_lock",
+                              buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1))
+ACTIVE_MISSIONS = Gauge("beacon_active_missions", "Missions whose agents or post-processing are running")
+LOOP_LAG_SECONDS = Histogram("beacon_event_loop_lag_seconds", "Extra delay of a periodic event-loop probe",
+                             buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 5))
+LLM_KEY_TOKENS = Counter("beacon_llm_key_tokens_total", "Tokens used per API key (hashed id; 'server' = the server's key)", ("key",))
+ANTHROPIC_CLIENTS = Gauge("beacon_anthropic_clients", "API keys with a pooled Anthropic client")
+ITERATION_DECISIONS = Counter("beacon_iteration_decisions_total", "Planned iterations skipped for lack of new inputs, or extra ones added",
+                              ("agent", "action"))
+MODEL_CASCADE = Counter("beacon_model_cascade_total", "Cascaded agent iterations by outcome (accepted on the fast model or escalated)",
+                        ("agent", "outcome"))
+CIRCUIT_OPEN = Gauge("beacon_upstream_circuit_open", "1 while an upstream's circuit breaker is open or half-open", ("upstream",))
+HEDGED_REQUESTS = Counter("beacon_hedged_requests_total", "Backup requests sent for slow upstream calls, by which one answered first",
+                          ("upstream", "winner"))
+TOOL_CALLS_DEDUPLICATED = Counter("beacon_tool_calls_deduplicated_total", "Tool calls served by an identical in-flight call")
+ADMISSION_WAIT_SECONDS = Histogram("beacon_admission_wait_seconds", "Time queued for an agent-iteration or LLM-call slot",
+                                   ("limiter", "priority"))
+ADMISSION_QUEUED = Gauge("beacon_admission_queued", "Callers waiting for a slot", ("limiter",))
+
+
+class TimedLock(asyncio.Lock):
+    """asyncio.Lock that records how long each acquire waited."""
+
+    async def acquire(self):
+        start = time.perf_counter()
+        result = await super().acquire()
+        LOCK_WAIT_SECONDS.observe(time.perf_counter() - start)
+        return result
+
+
+ANTHROPIC_POOL_SIZE = int(os.environ.get("BEACON_ANTHROPIC_POOL_SIZE", "32"))  # distinct API keys kept warm
+ANTHROPIC_CLIENT_IDLE = 900.0  # seconds before an unused key's client is dropped
+
+
+def key_id(api_key: str | None) -> str:
+    """Stable, non-reversible identity for an API key, safe for metrics and logs."""
+    return "server" if api_key is None else "byok-" + hashlib.sha256(api_key.encode()).hexdigest()[:10]
+
+
+class AnthropicClientPool:
+    """AsyncAnthropic clients keyed by hashed API key, bounded and idle-evicted.
+
+    Every client shares one httpx connection pool, so keep-alive connections
+    to the API are reused across keys, missions and calls; evicting a client
+    only drops its key, never sockets another key is using. Raw keys live
+    only inside the client objects.
+    """
+
+    def __init__(self, max_size: int, idle: float):
+        self.max_size = max_size
+        self.idle = idle
+        self.clients: OrderedDict[str, dict] = OrderedDict()  # key id -> {"client", "last_used", "in_use"}
+        self.http = None
+        self.stats = {"created": 0, "evicted": 0}
+
+    def _evict(self):
+        now = time.monotonic()
+        for kid, entry in list(self.clients.items()):
+            over_size = len(self.clients) > self.max_size
+            if entry["in_use"] == 0 and (over_size or now - entry["last_used"] > self.idle):
+                del self.clients[kid]
+                self.stats["evicted"] += 1
+
+    @contextmanager
+    def client(self, api_key: str | None):
+        kid = key_id(api_key)
+        entry = self.clients.get(kid)
+        if entry is None:
+            if self.http is None:
+                self.http = anthropic.DefaultAsyncHttpxClient(
+                    limits=httpx.Limits(max_connections=200, max_keepalive_connections=50, keepalive_expiry=60))
+            client = anthropic.AsyncAnthropic(**({"api_key": api_key} if api_key else {}), http_client=self.http)
+            entry = self.clients[kid] = {"client": client, "last_used": time.monotonic(), "in_use": 0}
+            self.stats["created"] += 1
+        self.clients.move_to_end(kid)
+        entry["in_use"] += 1
+        try:
+            yield kid, entry["client"]
+        finally:
+            entry["in_use"] -= 1
+            entry["last_used"] = time.monotonic()
+            self._evict()
+            ANTHROPIC_CLIENTS.set(len(self.clients))
+
+    def status(self) -> dict:
+        return {"clients": len(self.clients), "max": self.max_size, "in_use": sum(e["in_use"] for e in self.clients.values()),
+                **self.stats}
+
+
+anthropic_pool = AnthropicClientPool(ANTHROPIC_POOL_SIZE, ANTHROPIC_CLIENT_IDLE)
+
+
+# ---------------------------------------------------------------------------
+# Admission control (global concurrency, fair per API key, interactive first)
+# ---------------------------------------------------------------------------
+
+AGENT_CONCURRENCY = int(os.environ.get("BEACON_AGENT_CONCURRENCY", "8"))  # agent iterations running at once
+LLM_CONCURRENCY = int(os.environ.get("BEACON_LLM_CONCURRENCY", "16"))     # Messages API calls in flight
+ADMISSION_REPORT_INTERVAL = 2.0  # seconds between queue position updates to a waiting caller
+INTERACTIVE, BACKGROUND = 0, 1
+# LLM calls someone is waiting on (synthesis and the summary endpoints); agent iterations and digests are background
+INTERACTIVE_LABELS = {"synthesis", "lab_summary", "researcher_briefing"}
+
+
+class FairLimiter:
+    """Concurrency limit whose waiters are served by priority, then round-robin across keys.
+
+    Keys are hashed API keys (key_id), so one key launching many missions
+    can't starve another; within a key, waiters are first come, first served.
+    Nothing is rejected: under load callers queue, and can be told their
+    position and an ETA from the average time a slot is held.
+    """
+
+    def __init__(self, name: str, limit: int):
+        self.name = name
+        self.limit = limit
+        self.active = 0
+        self.queues: dict[int, OrderedDict[str, deque[asyncio.Future]]] = {INTERACTIVE: OrderedDict(), BACKGROUND: OrderedDict()}
+        self.hold = 10.0  # moving average of seconds a slot is held
+        self.stats = {"admitted": 0, "queued": 0}
+
+    def waiting(self) -> int:
+        return sum(len(w) for keys in self.queues.values() for w in keys.values())
+
+    def position(self, future: asyncio.Future, priority: int, key: str) -> int:
+        """Waiters served before `future` (round-robin means keys with shorter queues go first)."""
+        ahead = sum(len(w) for p, keys in self.queues.items() if p < priority for w in keys.values())
+        keys = self.queues[priority]
+        order = list(keys)
+        mine = keys[key].index(future)
+        for k, waiters in keys.items():
+            ahead += mine if k == key else min(len(waiters), mine + (order.index(k) < order.index(key)))
+        return ahead
+
+    def eta(self, position: int) -> float:
+        return round((position + 1) * self.hold / self.limit, 1)
+
+    def _dispatch(self):
+        for priority in sorted(self.queues):
+            keys = self.queues[priority]
+            while keys and self.active < self.limit:
+                key, waiters = next(iter(keys.items()))
+                future = waiters.popleft()
+                if waiters:
+                    keys.move_to_end(key)
+                else:
+                    del keys[key]
+                self.active += 1
+                future.set_result(None)
+        ADMISSION_QUEUED.set(self.waiting(), limiter=self.name)
+
+    def _release(self):
+        self.active -= 1
+        self._dispatch()
+
+    async def _wait(self, key: str, priority: int, timeout: float | None, on_wait) -> None:
+        future = asyncio.get_running_loop().create_future()
+        self.queues[priority].setdefault(key, deque()).append(future)
+        self.stats["queued"] += 1
+        ADMISSION_QUEUED.set(self.waiting(), limiter=self.name)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        try:
+            while not future.done():
+                if on_wait:
+                    position = self.position(future, priority, key)
+                    await on_wait(position, self.eta(position))
+                step = ADMISSION_REPORT_INTERVAL if deadline is None else min(ADMISSION_REPORT_INTERVAL, deadline - time.monotonic())
+                if step <= 0:
+                    raise asyncio.TimeoutError
+                await asyncio.wait({future}, timeout=step)
+        except BaseException:
+            if future.done():
+                self._release()  # admitted while giving up: hand the slot on
+            else:
+                future.cancel()
+                waiters = self.queues[priority].get(key)
+                if waiters is not None:
+                    waiters.remove(future)
+                    if not waiters:
+                        del self.queues[priority][key]
+                ADMISSION_QUEUED.set(self.waiting(), limiter=self.name)
+            raise
+
+    @asynccontextmanager
+    async def slot(self, key: str, priority: int = BACKGROUND, timeout: float | None = None, on_wait=None):
+        """Hold one slot; raises asyncio.TimeoutError if none frees up within `timeout` seconds.
+
+        on_wait(position, eta_seconds) is awaited while queued, every ADMISSION_REPORT_INTERVAL.
+        """
+        start = time.monotonic()
+        if self.active < self.limit and not self.waiting():
+            self.active += 1
+        else:
+            await self._wait(key, priority, timeout, on_wait)
+        admitted = time.monotonic()
+        ADMISSION_WAIT_SECONDS.observe(admitted - start, limiter=self.name, priority="interactive" if priority == INTERACTIVE else "background")
+        self.stats["admitted"] += 1
+        try:
+            yield
+        finally:
+            self.hold = 0.8 * self.hold + 0.2 * (time.monotonic() - admitted)
+            self._release()
+
+    def status(self) -> dict:
+        return {"limit": self.limit, "active": self.active, "waiting": self.waiting(), "avg_hold_s": round(self.hold, 2),
+                **self.stats}
+
+
+agent_slots = FairLimiter("agents", AGENT_CONCURRENCY)
+llm_slots = FairLimiter("llm", LLM_CONCURRENCY)
+
+
+async def create_message(api_key: str | None, agent: str, **kwargs):
+    """messages.create with latency and token usage recorded per model and agent.
+
+    Under a replay cassette the recorded response is returned instead; under
+    a recording cassette the response is saved.
+    """
+    model = kwargs.get("model", "")
+    cassette = current_cassette
+    with span("llm", model=model, agent=agent):
+        start = time.perf_counter()
+        if cassette and cassette.mode == "replay":
+            recorded = await cassette.replay("llm", agent)
+            if recorded is None:
+                raise RuntimeError(f"No recorded LLM response for {agent} in cassette {cassette.path.name}")
+            response = anthropic.types.Message.model_validate(recorded)
+        else:
+            priority = INTERACTIVE if agent in INTERACTIVE_LABELS else BACKGROUND
+            async with llm_slots.slot(key_id(api_key), priority):
+                with anthropic_pool.client(api_key) as (kid, client):
+                    set_span_attrs(key=kid)
+                    response = await client.messages.create(**kwargs)
+            if cassette:
+                cassette.record("llm", agent, response.model_dump(mode="json"), time.perf_counter() - start)
+        LLM_SECONDS.observe(time.perf_counter() - start, model=model, agent=agent)
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            LLM_TOKENS.inc(usage.input_tokens or 0, model=model, agent=agent, kind="input")
+            LLM_TOKENS.inc(usage.output_tokens or 0, model=model, agent=agent, kind="output")
+            LLM_KEY_TOKENS.inc((usage.input_tokens or 0) + (usage.output_tokens or 0), key=key_id(api_key))
+            set_span_attrs(input_tokens=usage.input_tokens, output_tokens=usage.output_tokens)
+        set_span_attrs(stop_reason=getattr(response, "stop_reason", None))
+    return response
+
+
+# ---------------------------------------------------------------------------
+# Tracing (mission -> agent -> iteration -> turn -> llm / tool -> http)
+# ---------------------------------------------------------------------------
+
+TRACE_DIR = os.environ.get("BEACON_TRACE_DIR", "")  # opt-in export: one <mission_id>.jsonl per mission
+TRACE_MISSIONS_KEPT = 20    # missions whose spans stay in memory
+TRACE_FILES_KEPT = 200      # mission files kept in TRACE_DIR; older ones are deleted
+TRACE_FLUSH_INTERVAL = 1.0  # seconds spans are buffered before a batched write
+
+current_span: ContextVar[dict | None] = ContextVar("current_span", default=None)
+# mission_id -> finished spans, most recent missions only (older ones are read back from TRACE_DIR)
+traces: OrderedDict[str, list[dict]] = OrderedDict()
+trace_buffer: list[dict] = []
+trace_flush_task: asyncio.Task | None = None
+trace_write_lock = threading.Lock()
+
+
+def _store_span(record: dict):
+    spans = traces.setdefault(record["trace_id"], [])
+    traces.move_to_end(record["trace_id"])
+    spans.append(record)
+    while len(traces) > TRACE_MISSIONS_KEPT:
+        traces.popitem(last=False)
+    if TRACE_DIR and record["trace_id"] != "none":
+        trace_buffer.append(record)
+        _schedule_trace_flush()
+
+
+def _trace_path(mission_id: str) -> Path:
+    return Path(TRACE_DIR) / ("".join(c if c.isalnum() or c in "-_" else "_" for c in mission_id) + ".jsonl")
+
+
+def _write_traces(batch: list[dict]):
+    """Append a batch of spans to their missions' files, then drop the oldest files past TRACE_FILES_KEPT."""
+    by_mission: dict[str, list[dict]] = {}
+    for record in batch:
+        by_mission.setdefault(record["trace_id"], []).append(record)
+    with trace_write_lock:
+        try:
+            Path(TRACE_DIR).mkdir(parents=True, exist_ok=True)
+            created = False
+            for mission_id, records in by_mission.items():
+                path = _trace_path(mission_id)
+                created = created or not path.exists()
+                with open(path, "a") as f:
+                    f.write("".join(json.dumps(r, default=str) + "\n" for r in records))
+            if created:
+                files = sorted(Path(TRACE_DIR).glob("*.jsonl"), key=lambda p: p.stat().st_mtime)
+                for old in files[:-TRACE_FILES_KEPT]:
+                    old.unlink(missing_ok=True)
+        except OSError as e:
+            print(f"  ⚠️  trace export failed: {e}")
+
+
+def _schedule_trace_flush():
+    global trace_flush_task
+    if trace_flush_task is not None:
+        return
+    try:
+        trace_flush_task = asyncio.get_running_loop().create_task(_flush_traces_later())
+    except RuntimeError:  # no event loop (scripts): write through
+        flush_traces()
+
+
+async def _flush_traces_later():
+    global trace_flush_task
+    await asyncio.sleep(TRACE_FLUSH_INTERVAL)
+    trace_flush_task = None
+    batch = trace_buffer[:]
+    trace_buffer.clear()
+    await asyncio.to_thread(_write_traces, batch)
+
+
+def flush_traces():
+    """Write buffered spans now (shutdown, benchmarks)."""
+    batch = trace_buffer[:]
+    trace_buffer.clear()
+    if batch:
+        _write_traces(batch)
+
+
+def _new_span(name: str, parent: dict | None, trace_id: str | None, attrs: dict) -> dict:
+    return {
+        "trace_id": trace_id or (parent or {}).get("trace_id") or current_mission_id or "none",
+        "span_id": uuid.uuid4().hex[:16],
+        "parent_id": parent["span_id"] if parent else None,
+        "name": name,
+        "start": time.time(),
+        "attrs": attrs,
+        "status": "ok",
+    }
+
+
+def _finish_span(record: dict, end: float | None = None):
+    record["end"] = end or time.time()
+    record["duration_ms"] = round((record["end"] - record["start"]) * 1000, 2)
+    _store_span(record)
+
+
+@contextmanager
+def span(name: str, trace_id: str | None = None, **attrs):
+    """Time a unit of work as a child of the current span. Child tasks inherit it via contextvars."""
+    record = _new_span(name, current_span.get(), trace_id, attrs)
+    token = current_span.set(record)
+    try:
+        yield record
+    except BaseException as e:
+        record["status"] = "error"
+        record["attrs"]["error"] = repr(e)[:200]
+        raise
+    finally:
+        current_span.reset(token)
+        _finish_span(record)
+
+
+def set_span_attrs(**attrs):
+    record = current_span.get()
+    if record is not None:
+        record["attrs"].update(attrs)
+
+
+def record_span(name: str, start: float, parent: dict | None, **attrs):
+    """Record an already-finished span (e.g. from httpx hooks, where no `with` block fits)."""
+    record = _new_span(name, parent, None, attrs)
+    record["start"] = start
+    _finish_span(record)
+
+
+def load_trace(mission_id: str) -> list[dict]:
+    if mission_id in traces:
+        return traces[mission_id]
+    if not TRACE_DIR or not _trace_path(mission_id).exists():
+        return []
+    with open(_trace_path(mission_id)) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def critical_path(spans: list[dict]) -> list[str]:
+    """Span ids from the root down, following the child that finished last at each level."""
+    children: dict[str | None, list[dict]] = {}
+    ids = {s["span_id"] for s in spans}
+    for s in spans:
+        parent = s["parent_id"] if s["parent_id"] in ids else None
+        children.setdefault(parent, []).append(s)
+    path, level = [], children.get(None, [])
+    while level:
+        last = max(level, key=lambda s: s["end"])
+        path.append(last["span_id"])
+        level = children.get(last["span_id"], [])
+    return path
+
+
+def render_waterfall(mission_id: str, spans: list[dict]) -> str:
+    if not spans:
+        return f"<p>No trace for mission {html.escape(mission_id)}</p>"
+    t0 = min(s["start"] for s in spans)
+    total = max(s["end"] for s in spans) - t0 or 1
+    on_path = set(critical_path(spans))
+    children: dict[str | None, list[dict]] = {}
+    ids = {s["span_id"] for s in spans}
+    for s in sorted(spans, key=lambda s: s["start"]):
+        children.setdefault(s["parent_id"] if s["parent_id"] in ids else None, []).append(s)
+
+    rows = []
+
+    def walk(parent, depth):
+        for s in children.get(parent, []):
+            left = (s["start"] - t0) / total * 100
+            width = max((s["end"] - s["start"]) / total * 100, 0.2)
+            attrs = ", ".join(f"{k}={v}" for k, v in s["attrs"].items())
+            color = "#dc2626" if s["status"] == "error" else "#f59e0b" if s["span_id"] in on_path else "#3b82f6"
+            rows.append(
+                f'<tr><td style="padding-left:{depth * 14}px">{html.escape(s["name"])}</td>'
+                f'<td>{s["duration_ms"]:,.0f} ms</td>'
+                f'<td class="bar"><div style="margin-left:{left:.2f}%;width:{width:.2f}%;background:{color}"></div></td>'
+                f'<td class="attrs">{html.escape(attrs)}</td></tr>'
+            )
+            walk(s["span_id"], depth + 1)
+
+    walk(None, 0)
+    return f"""<!doctype html><html><head><meta charset="utf-8"><title>Trace {html.escape(mission_id)}</title>
+<style>body{{font:12px system-ui;margin:16px}}table{{border-collapse:collapse;width:100%}}td{{padding:2px 6px;white-space:nowrap}}
+td.bar{{width:55%}}td.bar div{{height:10px;border-radius:2px}}td.attrs{{color:#64748b;overflow:hidden;max-width:420px}}tr:hover{{background:#f1f5f9}}</style>
+</head><body><h3>Mission {html.escape(mission_id)} — {total:,.1f}s, {len(spans)} spans (critical path in amber)</h3>
+<table>{"".join(rows)}</table></body></html>"""
+
+
+# ---------------------------------------------------------------------------
+# Record / replay cassettes
+# ---------------------------------------------------------------------------
+
+CASSETTE_DIR = Path(os.environ.get("BEACON_CASSETTE_DIR", str(Path(__file__).parent / "cassettes")))
+RECORD_MISSIONS = os.environ.get("BEACON_RECORD_MISSIONS") == "1"
+CASSETTES_KEPT = int(os.environ.get("BEACON_CASSETTES_KEPT", "50"))  # older recordings are deleted
+
+
+class Cassette:
+    """Every LLM response and upstream tool exchange of one mission, in a gzipped JSONL file.
+
+    LLM calls are matched by caller (agent name, "synthesis", ...) in call
+    order, since prompts embed timestamps; tool exchanges are matched by their
+    normalized request key. Replay sleeps each recorded duration / speed
+    (speed 0 replays instantly) and never touches the network.
+    """
+
+    def __init__(self, path: Path, mode: str, header: dict | None = None, speed: float = 1.0):
+        self.path = path
+        self.mode = mode  # "record" | "replay"
+        self.header = header or {}
+        self.speed = speed
+        self.entries: list[dict] = []
+        self._queues: dict[tuple, list[dict]] = {}
+        self._last: dict[tuple, dict] = {}
+        self.started = time.time()
+
+    @classmethod
+    def load(cls, name: str, speed: float) -> Cassette:
+        path = CASSETTE_DIR / Path(name).name
+        if not path.name.endswith(".jsonl.gz"):
+            path = path.with_name(path.name + ".jsonl.gz")
+        with gzip.open(path, "rt") as f:
+            lines = [json.loads(line) for line in f]
+        cassette = cls(path, "replay", lines[0], speed)
+        for entry in lines[1:]:
+            cassette._queues.setdefault((entry["kind"], entry["key"]), []).append(entry)
+        return cassette
+
+    def record(self, kind: str, key: str, response, duration: float):
+        self.entries.append({"kind": kind, "key": key, "t": round(time.time() - self.started, 3),
+                             "duration": round(duration, 3), "response": response})
+
+    async def replay(self, kind: str, key: str):
+        """Next recorded response for (kind, key); repeats the last one if the mission asks more often."""
+        queue = self._queues.get((kind, key))
+        entry = queue.pop(0) if queue else self._last.get((kind, key))
+        if entry is None:
+            return None
+        self._last[(kind, key)] = entry
+        if self.speed > 0:
+            await asyncio.sleep(entry["duration"] / self.speed)
+        return entry["response"]
+
+    def save(self):
+        """Write the cassette, then drop the oldest recordings past CASSETTES_KEPT."""
+        CASSETTE_DIR.mkdir(parents=True, exist_ok=True)
+        with gzip.open(self.path, "wt") as f:
+            f.write(json.dumps(self.header, default=str) + "\n")
+            for entry in self.entries:
+                f.write(json.dumps(entry, default=str) + "\n")
+        print(f"  📼 Recorded {len(self.entries)} exchanges to {self.path.name}")
+        files = sorted(CASSETTE_DIR.glob("*.jsonl.gz"), key=lambda p: p.stat().st_mtime)
+        for old in files[:-CASSETTES_KEPT]:
+            old.unlink(missing_ok=True)
+
+
+current_cassette: Cassette | None = None
+
+
+def list_cassettes() -> list[dict]:
+    cassettes = []
+    for path in sorted(CASSETTE_DIR.glob("*.jsonl.gz")):
+        with gzip.open(path, "rt") as f:
+            header = json.loads(f.readline() or "{}")
+        cassettes.append({"name": path.name.removesuffix(".jsonl.gz"), "size": path.stat().st_size, **header})
+    return cassettes
+
+
 # ---------------------------------------------------------------------------
 # In-memory state (replaces file I/O)
 # ---------------------------------------------------------------------------
 
-state_lock = asyncio.Lock()
+# Guards mission-level writes (launch reset, merges into shared_plan, synthesis).
+# Per-agent status/update writes take that agent's own lock; readers take none.
+state_lock = TimedLock()
+agent_locks: dict[str, TimedLock] = {}
+
+
+def agent_lock(agent_name: str) -> TimedLock:
+    lock = agent_locks.get(agent_name)
+    if lock is None:
+        lock = agent_locks[agent_name] = TimedLock()
+    return lock
+
 
 app_state: dict = {
     "mission": {},
@@ -127,9 +821,407 @@ shared_plan: dict = {
     "log": [],
 }
 
+# ---------------------------------------------------------------------------
+# Versioned snapshots: writers publish, readers get cached bytes lock-free
+# ---------------------------------------------------------------------------
+
+BOOT_ID = uuid.uuid4().hex[:8]  # keeps ETags from colliding across restarts
+state_versions = {"state": 0, "plan": 0}
+snapshot_cache: dict[str, tuple[int, bytes]] = {}
+
+
+version_events: dict[str, asyncio.Event] = {}
+
+
+def publish(*names: str):
+    """Mark app_state ("state") and/or shared_plan ("plan") as changed. Call after every write."""
+    for name in names:
+        state_versions[name] += 1
+        event = version_events.pop(name, None)
+        if event:
+            event.set()
+    state_dirty.set()
+
+
+async def wait_for_publish(name: str, timeout: float) -> bool:
+    """Wait until `name` is next published; False on timeout."""
+    event = version_events.setdefault(name, asyncio.Event())
+    try:
+        await asyncio.wait_for(event.wait(), timeout)
+        return True
+    except asyncio.TimeoutError:
+        return False
+
+
+def snapshot(name: str) -> tuple[int, bytes]:
+    """(version, JSON bytes) of app_state or shared_plan, serialized at most once per version.
+
+    Serialization is synchronous, so it sees a consistent state between two
+    writer awaits without taking any lock.
+    """
+    version = state_versions[name]
+    cached = snapshot_cache.get(name)
+    if cached and cached[0] == version:
+        return cached
+    obj = app_state if name == "state" else shared_plan
+    data = dumps_bytes(obj)
+    snapshot_cache[name] = (version, data)
+    return version, data
+
+
+def etag_for(name: str, version: int) -> str:
+    return f'"{BOOT_ID}-{name}-{version}"'
+
+
+async def snapshot_response(name: str, request: Request) -> Response:
+    """app_state / shared_plan with an ETag; from the state bus when another worker runs the mission."""
+    if state_bus.shared and mission_owner not in (None, BOOT_ID):
+        stored = await state_bus.get(f"snapshot:{name}")
+        etag, _, data = stored.partition(b"\n") if stored else (b'"empty"', b"", b"{}")
+        etag = etag.decode()
+    else:
+        version, data = snapshot(name)
+        etag = etag_for(name, version)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=data, media_type="application/json", headers=headers)
+
+
+# ---------------------------------------------------------------------------
+# State bus: snapshots, mission ownership and events shared across workers
+# ---------------------------------------------------------------------------
+
+STATE_BACKEND = os.environ.get("BEACON_STATE_BACKEND", "memory")  # "memory" or "sqlite:///path/to/state.db"
+STATE_SYNC_INTERVAL = 0.2  # seconds writes are coalesced before snapshots are pushed to the bus
+SQLITE_POLL_INTERVAL = 0.1
+SQLITE_EVENT_RETENTION = 120.0  # seconds of events kept for slow subscribers
+
+
+class InProcessStateBus:
+    """Default bus: one process, nothing to share. Snapshots are served straight from memory."""
+
+    shared = False
+
+    def __init__(self):
+        self.kv: dict[str, bytes] = {}
+        self.subscribers: dict[str, set[asyncio.Queue]] = {}
+
+    async def get(self, key: str) -> bytes | None:
+        return self.kv.get(key)
+
+    async def set(self, key: str, value: bytes):
+        self.kv[key] = value
+
+    async def publish(self, channel: str, message: bytes):
+        for queue in self.subscribers.get(channel, ()):
+            queue.put_nowait(message)
+
+    async def subscribe(self, channel: str):
+        queue: asyncio.Queue = asyncio.Queue()
+        self.subscribers.setdefault(channel, set()).add(queue)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self.subscribers[channel].discard(queue)
+
+
+class SQLiteStateBus:
+    """Bus in a SQLite file (WAL) shared by every worker on the host: a key/value table plus an event log
+    that subscribers poll. Calls run in worker threads so the event loop never blocks on the file."""
+
+    shared = True
+
+    def __init__(self, path: str):
+        self.path = path
+        self.lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA busy_timeout=5000")
+        self.db.execute("CREATE TABLE IF NOT EXISTS kv (key TEXT PRIMARY KEY, value BLOB)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS events (id INTEGER PRIMARY KEY AUTOINCREMENT, channel TEXT, "
+                        "message BLOB, created REAL)")
+        self.db.execute("CREATE TABLE IF NOT EXISTS jobs (id INTEGER PRIMARY KEY AUTOINCREMENT, payload BLOB, status TEXT, "
+                        "worker TEXT, attempts INTEGER DEFAULT 0, created REAL, heartbeat REAL)")
+
+    def _run(self, sql: str, params: tuple = ()) -> list:
+        with self.lock:
+            return self.db.execute(sql, params).fetchall()
+
+    async def get(self, key: str) -> bytes | None:
+        rows = await asyncio.to_thread(self._run, "SELECT value FROM kv WHERE key = ?", (key,))
+        return rows[0][0] if rows else None
+
+    async def set(self, key: str, value: bytes):
+        await asyncio.to_thread(self._run, "INSERT OR REPLACE INTO kv (key, value) VALUES (?, ?)", (key, value))
+
+    def _publish(self, channel: str, message: bytes):
+        now = time.time()
+        with self.lock:
+            self.db.execute("INSERT INTO events (channel, message, created) VALUES (?, ?, ?)", (channel, message, now))
+            self.db.execute("DELETE FROM events WHERE created < ?", (now - SQLITE_EVENT_RETENTION,))
+
+    async def publish(self, channel: str, message: bytes):
+        await asyncio.to_thread(self._publish, channel, message)
+
+    # Mission jobs for agent workers. A payload may carry a BYOK key, so it is dropped once the job is over.
+
+    def _enqueue(self, payload: bytes) -> int:
+        with self.lock:
+            # Single-mission model: a new launch supersedes anything still waiting
+            self.db.execute("UPDATE jobs SET status = 'superseded', payload = NULL WHERE status = 'queued'")
+            return self.db.execute("INSERT INTO jobs (payload, status, created) VALUES (?, 'queued', ?)",
+                                   (payload, time.time())).lastrowid
+
+    async def enqueue_job(self, payload: bytes) -> int:
+        return await asyncio.to_thread(self._enqueue, payload)
+
+    async def claim_job(self, worker: str, lease: float) -> tuple[int, bytes, int] | None:
+        """Atomically take the oldest queued job, or a running one whose worker missed heartbeats for `lease` seconds."""
+        now = time.time()
+        rows = await asyncio.to_thread(
+            self._run,
+            "UPDATE jobs SET status = 'running', worker = ?, heartbeat = ?, attempts = attempts + 1 WHERE id = ("
+            " SELECT id FROM jobs WHERE (status = 'queued' OR (status = 'running' AND heartbeat < ?)) AND attempts < ?"
+            " ORDER BY id LIMIT 1) RETURNING id, payload, attempts",
+            (worker, now, now - lease, JOB_MAX_ATTEMPTS))
+        return tuple(rows[0]) if rows else None
+
+    async def heartbeat_job(self, job_id: int, worker: str):
+        await asyncio.to_thread(self._run, "UPDATE jobs SET heartbeat = ? WHERE id = ? AND worker = ?",
+                                (time.time(), job_id, worker))
+
+    async def finish_job(self, job_id: int, status: str):
+        await asyncio.to_thread(self._run, "UPDATE jobs SET status = ?, payload = NULL WHERE id = ?", (status, job_id))
+
+    async def job_counts(self) -> dict[str, int]:
+        return dict(await asyncio.to_thread(self._run, "SELECT status, COUNT(*) FROM jobs GROUP BY status"))
+
+    async def subscribe(self, channel: str):
+        rows = await asyncio.to_thread(self._run, "SELECT COALESCE(MAX(id), 0) FROM events")
+        last = rows[0][0]
+        while True:
+            rows = await asyncio.to_thread(self._run, "SELECT id, message FROM events WHERE id > ? AND channel = ? ORDER BY id",
+                                           (last, channel))
+            for last, message in rows:
+                yield message
+            await asyncio.sleep(SQLITE_POLL_INTERVAL)
+
+
+def make_state_bus(url: str):
+    if url in ("", "memory"):
+        return InProcessStateBus()
+    if url.startswith("sqlite:///"):
+        return SQLiteStateBus(url.removeprefix("sqlite:///"))
+    raise ValueError(f"Unsupported BEACON_STATE_BACKEND: {url} (use memory or sqlite:///path)")
+
+
+state_bus = make_state_bus(STATE_BACKEND)
+mission_owner: str | None = None  # BOOT_ID of the worker running the current mission
+state_dirty = asyncio.Event()
+
+
+async def announce_mission(mission_id: str, owner: str = BOOT_ID):
+    """Claim the current mission for `owner` (this worker by default); other workers stop any agents they still run."""
+    global mission_owner
+    mission_owner = owner
+    message = dumps_bytes({"mission_id": mission_id, "owner": owner})
+    await state_bus.set("mission", message)
+    await state_bus.publish("missions", message)
+
+
+async def follow_missions():
+    """Track which worker owns the current mission; a mission launched elsewhere supersedes ours."""
+    global mission_owner, current_mission_id
+    stored = await state_bus.get("mission")
+    if stored:
+        mission_owner = json_loads(stored)["owner"]
+    async for message in state_bus.subscribe("missions"):
+        claim = json_loads(message)
+        mission_owner = claim["owner"]
+        if claim["owner"] != BOOT_ID and current_mission_id != claim["mission_id"]:
+            print(f"  🔀 Mission {claim['mission_id']} launched on worker {claim['owner']}; stopping local agents")
+            current_mission_id = claim["mission_id"]
+
+
+async def sync_state():
+    """Push changed snapshots to the bus (shared backends only) and announce new versions as events.
+
+    Writes are coalesced for STATE_SYNC_INTERVAL, so a burst of publish()
+    calls costs one serialization and one event per snapshot.
+    """
+    synced = dict(state_versions)
+    while True:
+        await state_dirty.wait()
+        await asyncio.sleep(STATE_SYNC_INTERVAL)
+        state_dirty.clear()
+        for name, version in list(state_versions.items()):
+            if version == synced.get(name):
+                continue
+            synced[name] = version
+            if state_bus.shared:
+                if mission_owner != BOOT_ID:
+                    continue
+                _, data = snapshot(name)
+                await state_bus.set(f"snapshot:{name}", etag_for(name, version).encode() + b"\n" + data)
+            await state_bus.publish("events", dumps_bytes({"name": name, "etag": etag_for(name, version)}))
+
+
 # All discovered MCP tool schemas, keyed by namespaced name
 mcp_tool_schemas: dict = {}  # e.g. "clinical_trials__search_trials" -> {name, description, input_schema}
 
+# ---------------------------------------------------------------------------
+# Upstream circuit breakers & hedged requests
+# ---------------------------------------------------------------------------
+
+UPSTREAM_TIMEOUT = httpx.Timeout(30.0, connect=5.0)
+BREAKER_FAILURES = 3        # consecutive failures that open a circuit
+BREAKER_COOLDOWN = 30.0     # seconds open before one probe request is let through
+BREAKER_MAX_COOLDOWN = 300.0
+HEDGE_DEFAULT_DELAY = 2.0   # seconds before a backup request, until enough latencies are recorded
+HEDGE_MIN_SAMPLES = 20
+
+
+class UpstreamUnavailable(httpx.TransportError):
+    """Raised instead of sending a request to an upstream whose circuit is open."""
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker for one upstream: closed -> open -> half-open (one probe) -> closed."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.state = "closed"
+        self.failures = 0
+        self.cooldown = BREAKER_COOLDOWN
+        self.opened_at = 0.0
+        self.probing = False
+        self.last_error = ""
+        self.latencies: deque[float] = deque(maxlen=200)
+
+    def check(self) -> bool:
+        """Raise UpstreamUnavailable while open; True when this request is the half-open probe."""
+        if self.state == "open" and time.monotonic() - self.opened_at >= self.cooldown:
+            self.state, self.probing = "half_open", False
+        if self.state == "open" or (self.state == "half_open" and self.probing):
+            retry_in = max(0.0, self.opened_at + self.cooldown - time.monotonic())
+            raise UpstreamUnavailable(
+                f"{self.name} is unavailable ({self.failures} consecutive failures, last: {self.last_error}); "
+                f"retrying in {retry_in:.0f}s. Do not call this source again now; continue with other sources.")
+        if self.state == "half_open":
+            self.probing = True
+            return True
+        return False
+
+    def success(self, seconds: float):
+        self.latencies.append(seconds)
+        if self.state != "closed":
+            print(f"  ✅ {self.name}: circuit closed")
+            CIRCUIT_OPEN.set(0, upstream=self.name)
+        self.state, self.failures, self.cooldown, self.probing = "closed", 0, BREAKER_COOLDOWN, False
+
+    def failure(self, error: str):
+        self.failures += 1
+        self.last_error = error[:120]
+        if self.state == "half_open":
+            self.cooldown = min(self.cooldown * 2, BREAKER_MAX_COOLDOWN)
+        if self.state == "half_open" or (self.state == "closed" and self.failures >= BREAKER_FAILURES):
+            print(f"  🔌 {self.name}: circuit open for {self.cooldown:.0f}s ({self.last_error})")
+            self.state, self.opened_at, self.probing = "open", time.monotonic(), False
+            CIRCUIT_OPEN.set(1, upstream=self.name)
+
+    def hedge_delay(self) -> float:
+        """p95 of recent successful latencies: past it, a backup request is likely to win."""
+        if len(self.latencies) < HEDGE_MIN_SAMPLES:
+            return HEDGE_DEFAULT_DELAY
+        ordered = sorted(self.latencies)
+        return max(0.2, ordered[int(len(ordered) * 0.95) - 1])
+
+    def status(self) -> dict:
+        return {"state": self.state, "failures": self.failures, "last_error": self.last_error or None,
+                "cooldown_s": self.cooldown, "hedge_delay_s": round(self.hedge_delay(), 3)}
+
+
+breakers: dict[str, CircuitBreaker] = {}
+
+
+def upstream_name(url: httpx.URL) -> str:
+    """Breaker key: the MCP server for MCP URLs (they share one host), the host otherwise."""
+    text = str(url)
+    for server_name, server_url in MCP_SERVERS.items():
+        if text.startswith(server_url):
+            return f"mcp:{server_name}"
+    return url.host
+
+
+def breaker_for(name: str) -> CircuitBreaker:
+    breaker = breakers.get(name)
+    if breaker is None:
+        breaker = breakers[name] = CircuitBreaker(name)
+    return breaker
+
+
+class BreakerTransport(httpx.AsyncBaseTransport):
+    """Wraps a transport: fails fast while an upstream's circuit is open, and feeds the breaker every outcome.
+
+    Transport errors (timeouts, connection and protocol errors), 429 and 5xx count as failures; other
+    statuses (including 4xx from bad arguments) count as the upstream working.
+    """
+
+    def __init__(self, inner: httpx.AsyncBaseTransport):
+        self.inner = inner
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        breaker = breaker_for(upstream_name(request.url))
+        probe = breaker.check()
+        start = time.perf_counter()
+        try:
+            response = await self.inner.handle_async_request(request)
+        except httpx.TransportError as e:
+            breaker.failure(f"{type(e).__name__}")
+            raise
+        finally:
+            if probe:
+                breaker.probing = False  # a cancelled or crashed probe (e.g. a hedge loser) must not keep the slot
+        if response.status_code == 429 or response.status_code >= 500:
+            breaker.failure(f"HTTP {response.status_code}")
+        else:
+            breaker.success(time.perf_counter() - start)
+        return response
+
+    async def aclose(self):
+        await self.inner.aclose()
+
+
+async def hedged(upstream: str, send):
+    """Await send(); if it is slower than the upstream's hedge delay, race a second send() against it.
+
+    Only for idempotent requests. The loser is cancelled.
+    """
+    first = asyncio.ensure_future(send())
+    try:
+        done, _ = await asyncio.wait({first}, timeout=breaker_for(upstream).hedge_delay())
+    except asyncio.CancelledError:
+        first.cancel()
+        raise
+    if done:
+        return first.result()
+    backup = asyncio.ensure_future(send())
+    pending = {first, backup}
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    HEDGED_REQUESTS.inc(upstream=upstream, winner="primary" if task is first else "hedge")
+                    return task.result()
+        return first.result()  # both failed: surface the primary's error
+    finally:
+        for task in pending:
+            task.cancel()
+
+
 # ---------------------------------------------------------------------------
 # MCP tool discovery & proxy
 # ---------------------------------------------------------------------------
@@ -137,10 +1229,28 @@ mcp_tool_schemas: dict = {}  # e.g. "clinical_trials__search_trials" -> {name, d
 http_client = None  # httpx.AsyncClient or None
 
 
+async def _on_upstream_request(request: httpx.Request):
+    request.extensions["beacon_start"] = time.perf_counter()
+    request.extensions["beacon_span"] = (time.time(), current_span.get())
+
+
+async def _on_upstream_response(response: httpx.Response):
+    request = response.request
+    start = request.extensions.get("beacon_start")
+    if start is not None:
+        UPSTREAM_SECONDS.observe(time.perf_counter() - start, host=request.url.host, status=response.status_code)
+    if "beacon_span" in request.extensions:
+        wall_start, parent = request.extensions["beacon_span"]
+        record_span("http", wall_start, parent, method=request.method, host=request.url.host, path=request.url.path,
+                    status=response.status_code, bytes=response.headers.get("content-length"))
+
+
 async def get_http_client() -> httpx.AsyncClient:
     global http_client
     if http_client is None or http_client.is_closed:
-        http_client = httpx.AsyncClient(timeout=60.0)
+        http_client = httpx.AsyncClient(transport=BreakerTransport(httpx.AsyncHTTPTransport()), timeout=UPSTREAM_TIMEOUT, event_hooks={
+            "request": [_on_upstream_request], "response": [_on_upstream_response],
+        })
     return http_client
 
 
@@ -183,7 +1293,7 @@ async def discover_all_tools():
     print(f"Total MCP tools discovered: {len(mcp_tool_schemas)}")
 
 
-async def call_mcp_tool(namespaced_name: str, arguments: dict) -> str:
+async def fetch_mcp_tool(namespaced_name: str, arguments: dict) -> str:
     """Proxy a tool call to the appropriate MCP server."""
     # Parse namespace: "clinical_trials__search_trials" -> server="clinical-trials", tool="search_trials"
     parts = namespaced_name.split("__", 1)
@@ -208,6 +1318,221 @@ async def call_mcp_tool(namespaced_name: str, arguments: dict) -> str:
         return json.dumps({"error": str(e)})
 
 
+# ---------------------------------------------------------------------------
+# PubMed (NCBI E-utilities): rate limiter, PMID cache, batched fetches
+# ---------------------------------------------------------------------------
+
+EUTILS_BASE = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils"
+NCBI_API_KEY = os.environ.get("NCBI_API_KEY")
+NCBI_EMAIL = os.environ.get("NCBI_EMAIL", "")
+
+PUBMED_BATCH_SIZE = 200        # max PMIDs per esummary/efetch POST
+PUBMED_BATCH_WINDOW = 0.05     # seconds to collect concurrent PMID lookups into one request
+PUBMED_HISTORY_THRESHOLD = 20  # result sets larger than this are paged via the history server
+PUBMED_CACHE_SIZE = 5000
+
+
+class AsyncRateLimiter:
+    """Spaces requests to at most `rate` per second without holding a lock across the request.
+
+    Each caller reserves the next free slot and sleeps until it, so concurrent
+    agents interleave instead of queueing behind each other's round trips.
+    """
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            now = loop.time()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+# NCBI allows 3 req/s per IP, 10 req/s with an API key
+ncbi_limiter = AsyncRateLimiter(10 if NCBI_API_KEY else 3)
+
+# PMID -> article summary / abstract, shared by every agent and mission
+pubmed_summary_cache: OrderedDict[str, dict] = OrderedDict()
+pubmed_abstract_cache: OrderedDict[str, str] = OrderedDict()
+
+
+def _cache_put(cache: OrderedDict, key: str, value):
+    cache[key] = value
+    cache.move_to_end(key)
+    while len(cache) > PUBMED_CACHE_SIZE:
+        cache.popitem(last=False)
+
+
+async def ncbi_request(endpoint: str, params: dict) -> httpx.Response:
+    """Rate-limited E-utilities request. Uses POST so long ID lists never hit URL limits."""
+    client = await get_http_client()
+    data = {**params, "tool": "beacon"}
+    if NCBI_API_KEY:
+        data["api_key"] = NCBI_API_KEY
+    if NCBI_EMAIL:
+        data["email"] = NCBI_EMAIL
+    await ncbi_limiter.acquire()
+    r = await client.post(f"{EUTILS_BASE}/{endpoint}", data=data)
+    r.raise_for_status()
+    return r
+
+
+def _parse_esummary(result_data: dict) -> dict[str, dict]:
+    articles = {}
+    for pmid in result_data.get("uids", []):
+        art = result_data.get(pmid)
+        if not isinstance(art, dict):
+            continue
+        articles[pmid] = {
+            "pmid": pmid,
+            "title": art.get("title", ""),
+            "authors": [a.get("name", "") for a in art.get("authors", [])[:5]],
+            "journal": art.get("fulljournalname", ""),
+            "pubDate": art.get("pubdate", ""),
+            "doi": art.get("elocationid", ""),
+        }
+    return articles
+
+
+def _parse_efetch_abstracts(xml_text: str) -> dict[str, str]:
+    abstracts = {}
+    root = ElementTree.fromstring(xml_text)
+    for article in root.iter("PubmedArticle"):
+        pmid = article.findtext("MedlineCitation/PMID")
+        if not pmid:
+            continue
+        parts = []
+        for node in article.iterfind("MedlineCitation/Article/Abstract/AbstractText"):
+            text = "".join(node.itertext()).strip()
+            label = node.get("Label")
+            parts.append(f"{label}: {text}" if label else text)
+        abstracts[pmid] = " ".join(parts)[:1500]
+    return abstracts
+
+
+class PubMedBatcher:
+    """Coalesces PMID lookups from concurrent callers into batched E-utilities requests.
+
+    Cached PMIDs return immediately, PMIDs already being fetched are awaited,
+    and the rest are collected for PUBMED_BATCH_WINDOW and fetched together.
+    """
+
+    def __init__(self, endpoint: str, params: dict, parse, cache: OrderedDict):
+        self.endpoint = endpoint
+        self.params = params
+        self.parse = parse
+        self.cache = cache
+        self._inflight: dict[str, asyncio.Future] = {}
+        self._pending: list[str] = []
+        self._flush_task: asyncio.Task | None = None
+
+    async def get(self, pmids: list[str]) -> dict:
+        loop = asyncio.get_running_loop()
+        futures = {}
+        for pmid in pmids:
+            if pmid in self.cache or pmid in futures:
+                continue
+            fut = self._inflight.get(pmid)
+            if fut is None:
+                fut = self._inflight[pmid] = loop.create_future()
+                self._pending.append(pmid)
+            futures[pmid] = fut
+        if self._pending and self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush())
+        if futures:
+            # Futures are shared with other callers: shield them from this caller's cancellation, and retrieve every
+            # outcome before raising, so a failed batch fails the lookup instead of reading as "no articles"
+            outcomes = await asyncio.gather(*map(asyncio.shield, futures.values()), return_exceptions=True)
+            for outcome in outcomes:
+                if isinstance(outcome, BaseException):
+                    raise outcome
+        return {pmid: self.cache[pmid] for pmid in pmids if pmid in self.cache}
+
+    def prime(self, items: dict):
+        for pmid, value in items.items():
+            _cache_put(self.cache, pmid, value)
+
+    async def _flush(self):
+        await asyncio.sleep(PUBMED_BATCH_WINDOW)
+        pending, self._pending, self._flush_task = self._pending, [], None
+        batches = [pending[i:i + PUBMED_BATCH_SIZE] for i in range(0, len(pending), PUBMED_BATCH_SIZE)]
+        await asyncio.gather(*[self._fetch(batch) for batch in batches])
+
+    async def _fetch(self, batch: list[str]):
+        error = None
+        try:
+            r = await ncbi_request(self.endpoint, {**self.params, "id": ",".join(batch)})
+            self.prime(self.parse(r))
+        except Exception as e:
+            error = e
+        for pmid in batch:
+            fut = self._inflight.pop(pmid, None)
+            if fut and not fut.done():
+                if error is not None:
+                    fut.set_exception(error)
+                    fut.exception()  # mark retrieved: every caller waiting on this PMID may have been cancelled
+                else:
+                    fut.set_result(None)
+
+
+pubmed_summaries = PubMedBatcher(
+    "esummary.fcgi", {"db": "pubmed", "retmode": "json"},
+    lambda r: _parse_esummary(r.json().get("result", {})), pubmed_summary_cache,
+)
+pubmed_abstracts = PubMedBatcher(
+    "efetch.fcgi", {"db": "pubmed", "rettype": "abstract", "retmode": "xml"},
+    lambda r: _parse_efetch_abstracts(r.text), pubmed_abstract_cache,
+)
+
+
+async def search_pubmed_articles(query: str, max_results: int = 10, include_abstracts: bool = False) -> list[dict]:
+    """esearch for PMIDs, then resolve summaries through the shared cache and batcher.
+
+    Large result sets keep the search on the NCBI history server and page the
+    summaries from there instead of re-sending every PMID.
+    """
+    use_history = max_results > PUBMED_HISTORY_THRESHOLD
+    search_r = await ncbi_request("esearch.fcgi", {
+        "db": "pubmed", "term": query, "retmax": max_results, "retmode": "json", "sort": "relevance",
+        **({"usehistory": "y"} if use_history else {}),
+    })
+    search = search_r.json().get("esearchresult", {})
+    ids = search.get("idlist", [])
+    if not ids:
+        return []
+
+    missing = [pmid for pmid in ids if pmid not in pubmed_summary_cache]
+    if use_history and len(missing) > PUBMED_HISTORY_THRESHOLD and search.get("webenv"):
+        for start in range(0, len(ids), PUBMED_BATCH_SIZE):
+            page = await ncbi_request("esummary.fcgi", {
+                "db": "pubmed", "retmode": "json", "WebEnv": search["webenv"],
+                "query_key": search.get("querykey", "1"), "retstart": start,
+                "retmax": min(PUBMED_BATCH_SIZE, len(ids) - start),
+            })
+            pubmed_summaries.prime(_parse_esummary(page.json().get("result", {})))
+
+    if include_abstracts:
+        summaries, abstracts = await asyncio.gather(pubmed_summaries.get(ids), pubmed_abstracts.get(ids))
+    else:
+        summaries, abstracts = await pubmed_summaries.get(ids), {}
+
+    articles = []
+    for pmid in ids:
+        art = summaries.get(pmid)
+        if art is None:
+            continue
+        if include_abstracts:
+            art = {**art, "abstract": abstracts.get(pmid, "")}
+        articles.append(art)
+    return articles
+
+
 # ---------------------------------------------------------------------------
 # Public API tools (no auth required)
 # ---------------------------------------------------------------------------
@@ -245,7 +1570,8 @@ PUBLIC_TOOL_DEFS = {
             "type": "object",
             "properties": {
                 "query": {"type": "string", "description": "Search query (e.g. 'CLN3 gene therapy')"},
-                "max_results": {"type": "integer", "description": "Number of results (default 10, max 20)", "default": 10},
+                "max_results": {"type": "integer", "description": "Number of results (default 10, max 100)", "default": 10},
+                "include_abstracts": {"type": "boolean", "description": "Also fetch abstracts (larger result)", "default": False},
             },
             "required": ["query"],
         },
@@ -308,10 +1634,51 @@ PUBLIC_TOOL_DEFS = {
             "required": ["disease_query"],
         },
     },
+    "get_trial_details_batch": {
+        "name": "get_trial_details_batch",
+        "description": "Get full details for several clinical trials at once. Same fields as get_trial_details, one entry per NCT ID. Prefer this over repeated get_trial_details calls.",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "nct_ids": {"type": "array", "items": {"type": "string"}, "description": "NCT identifiers (max 20)"},
+            },
+            "required": ["nct_ids"],
+        },
+    },
+    "search_chembl_compound_batch": {
+        "name": "search_chembl_compound_batch",
+        "description": "Search ChEMBL for several compounds by name at once. Same fields as search_chembl_compound, one entry per name. Use this to gather a candidate set in one call.",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "names": {"type": "array", "items": {"type": "string"}, "description": "Compound or drug names (max 20)"},
+            },
+            "required": ["names"],
+        },
+    },
+    "search_chembl_target_batch": {
+        "name": "search_chembl_target_batch",
+        "description": "Search ChEMBL for several targets by name or gene symbol at once. Same fields as search_chembl_target, one entry per query.",
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "queries": {"type": "array", "items": {"type": "string"}, "description": "Target names or gene symbols (max 20)"},
+            },
+            "required": ["queries"],
+        },
+    },
 }
 
+# Batch tool -> (single tool it fans out to, list argument, single argument)
+PUBLIC_BATCH_TOOLS = {
+    "get_trial_details_batch": ("get_trial_details", "nct_ids", "nct_id"),
+    "search_chembl_compound_batch": ("search_chembl_compound", "names", "name"),
+    "search_chembl_target_batch": ("search_chembl_target", "queries", "query"),
+}
+BATCH_TOOL_MAX_ITEMS = 20
 
-async def call_public_tool(tool_name: str, arguments: dict) -> str:
+
+async def fetch_public_tool(tool_name: str, arguments: dict) -> str:
     """Call a public API tool and return results as JSON string."""
     client = await get_http_client()
 
@@ -328,7 +1695,7 @@ async def call_public_tool(tool_name: str, arguments: dict) -> str:
                 params["query.intr"] = interv
             if status:
                 params["filter.overallStatus"] = status
-            r = await client.get("https://clinicaltrials.gov/api/v2/studies", params=params)
+            r = await hedged("clinicaltrials.gov", lambda: client.get("https://clinicaltrials.gov/api/v2/studies", params=params))
             r.raise_for_status()
             studies = r.json().get("studies", [])
             results = []
@@ -349,11 +1716,11 @@ async def call_public_tool(tool_name: str, arguments: dict) -> str:
                     "sponsor": sponsor.get("leadSponsor", {}).get("name"),
                     "startDate": status_mod.get("startDateStruct", {}).get("date"),
                 })
-            return json.dumps({"total": len(results), "trials": results}, indent=2)
+            return json.dumps({"total": len(results), "trials": results})
 
         elif tool_name == "get_trial_details":
             nct_id = arguments["nct_id"]
-            r = await client.get(f"https://clinicaltrials.gov/api/v2/studies/{nct_id}", params={"format": "json"})
+            r = await hedged("clinicaltrials.gov", lambda: client.get(f"https://clinicaltrials.gov/api/v2/studies/{nct_id}", params={"format": "json"}))
             r.raise_for_status()
             proto = r.json().get("protocolSection", {})
             ident = proto.get("identificationModule", {})
@@ -378,44 +1745,17 @@ async def call_public_tool(tool_name: str, arguments: dict) -> str:
                 "secondaryOutcomes": (outcomes.get("secondaryOutcomes") or [])[:5],
                 "interventions": arms.get("interventions", []),
                 "locations": [{"facility": loc.get("facility"), "city": loc.get("city"), "state": loc.get("state"), "country": loc.get("country")} for loc in (contacts.get("locations") or [])[:10]],
-            }, indent=2)
+            })
 
         elif tool_name == "search_pubmed":
             query = arguments["query"]
-            max_results = min(arguments.get("max_results", 10), 20)
-            # Step 1: search for PMIDs
-            search_r = await client.get("https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi", params={
-                "db": "pubmed", "term": query, "retmax": max_results, "retmode": "json", "sort": "relevance",
-            })
-            search_r.raise_for_status()
-            ids = search_r.json().get("esearchresult", {}).get("idlist", [])
-            if not ids:
-                return json.dumps({"total": 0, "articles": []})
-            # Step 2: fetch summaries
-            summary_r = await client.get("https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esummary.fcgi", params={
-                "db": "pubmed", "id": ",".join(ids), "retmode": "json",
-            })
-            summary_r.raise_for_status()
-            result_data = summary_r.json().get("result", {})
-            articles = []
-            for pmid in ids:
-                art = result_data.get(pmid, {})
-                if not isinstance(art, dict):
-                    continue
-                authors = [a.get("name", "") for a in art.get("authors", [])[:5]]
-                articles.append({
-                    "pmid": pmid,
-                    "title": art.get("title", ""),
-                    "authors": authors,
-                    "journal": art.get("fulljournalname", ""),
-                    "pubDate": art.get("pubdate", ""),
-                    "doi": art.get("elocationid", ""),
-                })
-            return json.dumps({"total": len(articles), "articles": articles}, indent=2)
+            max_results = min(arguments.get("max_results", 10), 100)
+            articles = await search_pubmed_articles(query, max_results, bool(arguments.get("include_abstracts")))
+            return json.dumps({"total": len(articles), "articles": articles})
 
         elif tool_name == "search_chembl_compound":
             name = arguments["name"]
-            r = await client.get(f"https://www.ebi.ac.uk/chembl/api/data/molecule/search.json", params={"q": name, "limit": 10})
+            r = await hedged("www.ebi.ac.uk", lambda: client.get(f"https://www.ebi.ac.uk/chembl/api/data/molecule/search.json", params={"q": name, "limit": 10}))
             r.raise_for_status()
             molecules = r.json().get("molecules", [])
             results = []
@@ -433,11 +1773,11 @@ async def call_public_tool(tool_name: str, arguments: dict) -> str:
                     "psa": props.get("psa"),
                     "ro5_violations": props.get("num_ro5_violations"),
                 })
-            return json.dumps({"total": len(results), "compounds": results}, indent=2)
+            return json.dumps({"total": len(results), "compounds": results})
 
         elif tool_name == "search_chembl_target":
             query = arguments["query"]
-            r = await client.get(f"https://www.ebi.ac.uk/chembl/api/data/target/search.json", params={"q": query, "limit": 10})
+            r = await hedged("www.ebi.ac.uk", lambda: client.get(f"https://www.ebi.ac.uk/chembl/api/data/target/search.json", params={"q": query, "limit": 10}))
             r.raise_for_status()
             targets = r.json().get("targets", [])
             results = []
@@ -455,14 +1795,14 @@ async def call_public_tool(tool_name: str, arguments: dict) -> str:
                     "organism": t.get("organism"),
                     "gene_symbols": gene_symbols[:3],
                 })
-            return json.dumps({"total": len(results), "targets": results}, indent=2)
+            return json.dumps({"total": len(results), "targets": results})
 
         elif tool_name == "search_chembl_bioactivity":
             target_id = arguments["target_chembl_id"]
             limit = min(arguments.get("limit", 20), 50)
-            r = await client.get(f"https://www.ebi.ac.uk/chembl/api/data/activity.json", params={
+            r = await hedged("www.ebi.ac.uk", lambda: client.get(f"https://www.ebi.ac.uk/chembl/api/data/activity.json", params={
                 "target_chembl_id": target_id, "limit": limit, "pchembl_value__isnull": "false",
-            })
+            }))
             r.raise_for_status()
             activities = r.json().get("activities", [])
             results = []
@@ -475,22 +1815,31 @@ async def call_public_tool(tool_name: str, arguments: dict) -> str:
                     "units": a.get("standard_units"),
                     "pchembl": a.get("pchembl_value"),
                 })
-            return json.dumps({"total": len(results), "activities": results}, indent=2)
+            return json.dumps({"total": len(results), "activities": results})
 
         elif tool_name == "search_openfda_orphan":
             query = arguments["query"]
             limit = min(arguments.get("limit", 10), 25)
-            r = await client.get("https://api.fda.gov/drug/drugsfda.json", params={
-                "search": f'openfda.brand_name:"{query}"+openfda.generic_name:"{query}"',
-                "limit": limit,
-            })
-            if r.status_code == 404:
-                # Try orphan drug product list
-                r2 = await client.get("https://api.fda.gov/drug/drugsfda.json", params={
+            # Both queries of the fallback chain go out together; the brand/generic match wins when it has results,
+            # and a failed secondary query never discards a good primary answer
+            r, r2 = await asyncio.gather(
+                client.get("https://api.fda.gov/drug/drugsfda.json", params={
+                    "search": f'openfda.brand_name:"{query}"+openfda.generic_name:"{query}"',
+                    "limit": limit,
+                }),
+                client.get("https://api.fda.gov/drug/drugsfda.json", params={
                     "search": f'products.active_ingredients.name:"{query}"',
                     "limit": limit,
-                })
-                if r2.status_code == 200:
+                }),
+                return_exceptions=True,
+            )
+            if isinstance(r, BaseException):
+                if not isinstance(r2, httpx.Response):
+                    raise r
+                r = r2
+            if r.status_code == 404:
+                # Try orphan drug product list
+                if isinstance(r2, httpx.Response) and r2.status_code == 200:
                     r = r2
                 else:
                     return json.dumps({"total": 0, "results": [], "note": "No orphan drug designations found"})
@@ -508,7 +1857,7 @@ async def call_public_tool(tool_name: str, arguments: dict) -> str:
                     "route": openfda.get("route", []),
                     "products": [{"name": p.get("brand_name"), "dosage": p.get("dosage_form"), "active_ingredients": p.get("active_ingredients", [])} for p in products[:3]],
                 })
-            return json.dumps({"total": len(results), "results": results}, indent=2)
+            return json.dumps({"total": len(results), "results": results})
 
         elif tool_name == "search_open_targets":
             disease_query = arguments["disease_query"]
@@ -565,7 +1914,7 @@ async def call_public_tool(tool_name: str, arguments: dict) -> str:
                 "disease_id": disease_id,
                 "total_associations": assoc_data.get("count", 0),
                 "top_targets": results,
-            }, indent=2)
+            })
 
         else:
             return json.dumps({"error": f"Unknown tool: {tool_name}"})
@@ -574,37 +1923,488 @@ async def call_public_tool(tool_name: str, arguments: dict) -> str:
         return json.dumps({"error": str(e), "tool": tool_name})
 
 
-# Which public tools each agent gets
-PUBLIC_TOOLS_PER_AGENT = {
-    "scout": ["search_clinical_trials", "get_trial_details", "search_pubmed", "search_chembl_compound"],
-    "connector": ["search_pubmed", "search_clinical_trials"],
-    "navigator": ["search_clinical_trials", "search_openfda_orphan"],
-    "mobilizer": ["search_clinical_trials", "search_pubmed"],
-    "strategist": [],
-    "biologist": ["search_chembl_target", "search_chembl_bioactivity", "search_open_targets", "search_pubmed"],
-    "chemist": ["search_chembl_compound", "search_chembl_target", "search_chembl_bioactivity"],
-    "preclinician": ["search_chembl_compound", "search_chembl_bioactivity", "search_pubmed"],
-}
-
-
 # ---------------------------------------------------------------------------
-# Agent conversation via Anthropic SDK
+# Single-flight coalescing of identical in-flight tool calls
 # ---------------------------------------------------------------------------
 
-def get_tools_for_agent(agent_name: str) -> list[dict]:
-    """Get Anthropic-format tool definitions for an agent.
+# Normalized request key -> task shared by every concurrent caller
+inflight_tool_calls: dict[str, asyncio.Task] = {}
+tool_call_stats = {"calls": 0, "deduplicated": 0}
 
-    Uses public API tools + web_search.
-    """
-    tools = []
 
-    # Add public API tools
-    for tool_name in PUBLIC_TOOLS_PER_AGENT.get(agent_name, []):
-        if tool_name in PUBLIC_TOOL_DEFS:
-            tools.append(PUBLIC_TOOL_DEFS[tool_name])
+def _normalize_arg(value, casefold: bool):
+    if isinstance(value, str):
+        value = " ".join(value.split())
+        return value.casefold() if casefold else value
+    if isinstance(value, dict):
+        return {k: _normalize_arg(v, casefold) for k, v in value.items() if v not in (None, "", [], {})}
+    if isinstance(value, list):
+        return [_normalize_arg(v, casefold) for v in value]
+    return value
 
-    # Also add MCP tools if discovered
-    allowed = MCP_TOOLS_PER_AGENT.get(agent_name, [])
+
+# Public tool arguments sent to case-insensitive full-text search; everything else (status filters, IDs) keeps its case
+FREE_TEXT_ARGS = {"condition", "intervention", "query", "name", "disease_query", "names", "queries"}
+
+
+def tool_call_key(tool_name: str, arguments: dict) -> str:
+    """Canonical key for a tool request: schema defaults filled, whitespace collapsed, keys sorted.
+
+    Free-text search arguments of public tools are also case-folded; other
+    arguments and all MCP arguments keep their case.
+    """
+    public = tool_name in PUBLIC_TOOL_DEFS
+    if public:
+        props = PUBLIC_TOOL_DEFS[tool_name]["input_schema"].get("properties", {})
+        arguments = {**{k: p["default"] for k, p in props.items() if "default" in p}, **arguments}
+    normalized = {k: _normalize_arg(v, casefold=public and k in FREE_TEXT_ARGS)
+                  for k, v in (arguments or {}).items() if v not in (None, "", [], {})}
+    return f"{tool_name}:{json.dumps(normalized, sort_keys=True, default=str)}"
+
+
+async def single_flight(key: str, factory) -> str:
+    """Run factory() once per key while it is in flight; concurrent callers share the result."""
+    tool_call_stats["calls"] += 1
+    task = inflight_tool_calls.get(key)
+    if task is None:
+        task = asyncio.create_task(factory())
+        inflight_tool_calls[key] = task
+
+        def _done(t, key=key):
+            if inflight_tool_calls.get(key) is t:
+                del inflight_tool_calls[key]
+
+        task.add_done_callback(_done)
+    else:
+        tool_call_stats["deduplicated"] += 1
+        TOOL_CALLS_DEDUPLICATED.inc()
+        set_span_attrs(deduplicated=True)
+    # Shield so one caller being cancelled doesn't cancel the shared request
+    return await asyncio.shield(task)
+
+
+async def call_public_tool(tool_name: str, arguments: dict) -> str:
+    with span("tool", tool=tool_name, source="public"):
+        if tool_name in PUBLIC_BATCH_TOOLS:
+            return await call_public_batch_tool(tool_name, arguments)
+        key = tool_call_key(tool_name, arguments)
+        prefetched = await take_prefetched(key)
+        if prefetched is not None:
+            set_span_attrs(prefetched=True)
+            return prefetched
+        return await single_flight(key, lambda: timed_tool("public", tool_name, arguments, fetch_public_tool))
+
+
+async def call_public_batch_tool(tool_name: str, arguments: dict) -> str:
+    """Fan a batch tool out to its single-item tool concurrently and combine the results.
+
+    Each item goes through call_public_tool, so items already prefetched or
+    in flight for another agent are shared.
+    """
+    single_tool, list_arg, item_arg = PUBLIC_BATCH_TOOLS[tool_name]
+    items = list(dict.fromkeys(i for i in (arguments.get(list_arg) or []) if isinstance(i, str) and i.strip()))
+    if not items:
+        return json.dumps({"error": f"{list_arg} must be a non-empty list of strings", "tool": tool_name})
+    dropped = items[BATCH_TOOL_MAX_ITEMS:]
+    items = items[:BATCH_TOOL_MAX_ITEMS]
+    texts = await asyncio.gather(*[call_public_tool(single_tool, {item_arg: item}) for item in items])
+    results = []
+    for item, text in zip(items, texts):
+        try:
+            parsed = json.loads(text)
+        except (json.JSONDecodeError, ValueError):
+            parsed = {"raw": text}
+        results.append({item_arg: item, **(parsed if isinstance(parsed, dict) else {"result": parsed})})
+    combined = {"total": len(results), "results": results}
+    if dropped:
+        combined["note"] = f"Only the first {BATCH_TOOL_MAX_ITEMS} items were searched; {len(dropped)} skipped"
+    return json.dumps(combined)
+
+
+async def call_mcp_tool(namespaced_name: str, arguments: dict) -> str:
+    with span("tool", tool=namespaced_name, source="mcp"):
+        return await single_flight(tool_call_key(namespaced_name, arguments), lambda: timed_tool("mcp", namespaced_name, arguments, fetch_mcp_tool))
+
+
+async def timed_tool(source: str, tool_name: str, arguments: dict, fetch) -> str:
+    """Run one upstream exchange via fetch(tool_name, arguments), recording or replaying it under a cassette."""
+    cassette = current_cassette
+    with span("fetch", tool=tool_name, source=source):
+        start = time.perf_counter()
+        if cassette and cassette.mode == "replay":
+            key = tool_call_key(tool_name, arguments)
+            result = await cassette.replay("tool", key)
+            if result is None:
+                result = json.dumps({"error": "Not in replay cassette", "tool": tool_name})
+        else:
+            result = await fetch(tool_name, arguments)
+            if cassette:
+                cassette.record("tool", tool_call_key(tool_name, arguments), result, time.perf_counter() - start)
+        outcome = "error" if result.startswith('{"error"') else "ok"
+        TOOL_SECONDS.observe(time.perf_counter() - start, tool=tool_name, source=source, outcome=outcome)
+        set_span_attrs(outcome=outcome, bytes=len(result))
+    return result
+
+
+# ---------------------------------------------------------------------------
+# Speculative prefetch of predictable first-turn tool calls
+# ---------------------------------------------------------------------------
+
+PREFETCH_TTL = 900  # seconds a prefetched result stays servable
+
+# Normalized request key -> {"task", "mission_id", "tool", "created", "hits"}
+prefetch_cache: dict[str, dict] = {}
+prefetch_stats: dict = {"issued": 0, "hits": 0, "wasted": 0, "wasted_by_tool": {}}
+
+
+def build_prefetch_plan(disease: str, priorities: list[str]) -> list[tuple[str, dict]]:
+    """Tool calls agents almost always make on their first turn, derived from the mission."""
+    plan = [
+        ("search_clinical_trials", {"condition": disease}),        # scout, connector, navigator, mobilizer
+        ("search_pubmed", {"query": disease}),                     # scout, connector, mobilizer, biologist
+        ("search_open_targets", {"disease_query": disease}),       # biologist
+    ]
+    # Gene-like tokens ("CLN3", "TPP1") are what biologist/chemist hand to ChEMBL target search
+    for token in disease.replace("/", " ").split():
+        if token.isupper() and any(c.isdigit() for c in token):
+            plan.append(("search_chembl_target", {"query": token}))
+    if not priorities or "research" in priorities:
+        plan.append(("search_clinical_trials", {"condition": disease, "status": "RECRUITING"}))
+    if not priorities or "regulatory" in priorities:
+        plan.append(("search_openfda_orphan", {"query": disease}))
+    return plan
+
+
+def start_prefetch(mission_id: str, disease: str, priorities: list[str]):
+    """Kick off the prefetch plan so agents' first tool calls find results already in flight or done."""
+    now = datetime.now().timestamp()
+    issued = 0
+    for tool_name, arguments in build_prefetch_plan(disease, priorities):
+        key = tool_call_key(tool_name, arguments)
+        if key in prefetch_cache:
+            continue
+        prefetch_cache[key] = {
+            "task": asyncio.create_task(timed_tool("prefetch", tool_name, arguments, fetch_public_tool)),
+            "mission_id": mission_id,
+            "tool": tool_name,
+            "created": now,
+            "hits": 0,
+        }
+        prefetch_stats["issued"] += 1
+        issued += 1
+    print(f"  ⚡ Prefetching {issued} first-turn tool calls")
+
+
+async def take_prefetched(key: str) -> str | None:
+    """Serve a prefetched result for this request, or None to fall through to a live call."""
+    entry = prefetch_cache.get(key)
+    if entry is None:
+        return None
+    if datetime.now().timestamp() - entry["created"] > PREFETCH_TTL:
+        _retire_prefetch(key)
+        return None
+    result = await asyncio.shield(entry["task"])
+    if result.startswith('{"error"'):
+        return None  # don't replay a failed prefetch; let the caller retry live
+    if entry["hits"] == 0:
+        prefetch_stats["hits"] += 1
+    entry["hits"] += 1
+    return result
+
+
+def _retire_prefetch(key: str):
+    entry = prefetch_cache.pop(key)
+    if entry["hits"] == 0:
+        prefetch_stats["wasted"] += 1
+        wasted = prefetch_stats["wasted_by_tool"]
+        wasted[entry["tool"]] = wasted.get(entry["tool"], 0) + 1
+
+
+def finish_prefetch(mission_id: str | None = None):
+    """Drop a mission's prefetches (all when mission_id is None), counting unused ones as wasted."""
+    keys = [k for k, e in prefetch_cache.items() if mission_id is None or e["mission_id"] == mission_id]
+    for key in keys:
+        _retire_prefetch(key)
+
+
+# ---------------------------------------------------------------------------
+# Tool result encoding: shared-header tables, record-level truncation
+# ---------------------------------------------------------------------------
+
+TOOL_RESULT_MAX_CHARS = 15000
+
+
+def _dumps_compact(obj) -> str:
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def tabulate_records(obj):
+    """Rewrite homogeneous lists of dicts as {"columns": [...], "rows": [[...], ...]}, recursively.
+
+    Trials, compounds, activities and articles repeat the same keys on every
+    record; stating them once is where most of the token savings come from.
+    """
+    if isinstance(obj, dict):
+        return {k: tabulate_records(v) for k, v in obj.items()}
+    if not isinstance(obj, list):
+        return obj
+    items = [tabulate_records(v) for v in obj]
+    if len(items) < 2 or not all(isinstance(v, dict) for v in items):
+        return items
+    columns = list(dict.fromkeys(k for v in items for k in v))
+    # Only worth it when records mostly share keys
+    if len(columns) > 1.5 * max(len(v) for v in items):
+        return items
+    return {"columns": columns, "rows": [[v.get(c) for c in columns] for v in items]}
+
+
+def _trim_candidates(obj, out: list | None = None) -> list:
+    """Collect (table_or_None, row_list) pairs that can lose trailing records."""
+    out = [] if out is None else out
+    if isinstance(obj, dict):
+        is_table = isinstance(obj.get("rows"), list) and "columns" in obj
+        if is_table:
+            out.append((obj, obj["rows"]))
+        for k, v in obj.items():
+            if is_table and k == "rows":
+                for row in v:
+                    _trim_candidates(row, out)
+            else:
+                _trim_candidates(v, out)
+    elif isinstance(obj, list):
+        out.append((None, obj))
+        for v in obj:
+            _trim_candidates(v, out)
+    return out
+
+
+def _truncate_longest_string(obj) -> bool:
+    best = None  # (length, container, key)
+    stack = [obj]
+    while stack:
+        node = stack.pop()
+        pairs = node.items() if isinstance(node, dict) else enumerate(node) if isinstance(node, list) else ()
+        for k, v in pairs:
+            if isinstance(v, str):
+                if len(v) > 200 and (best is None or len(v) > best[0]):
+                    best = (len(v), node, k)
+            else:
+                stack.append(v)
+    if best is None:
+        return False
+    length, node, k = best
+    node[k] = node[k][:length // 2] + " …[truncated]"
+    return True
+
+
+def _omission_marker(container, count: int) -> str:
+    """Text the "N more omitted" marker adds to a shortened table, list or dict."""
+    if isinstance(container, list):
+        return f',"... {count} more omitted"'
+    if "columns" in container and "rows" in container:
+        return f',"omitted":"{count} more rows omitted"'
+    return f',"omitted_keys":"{count} more keys omitted"'
+
+
+def _drop_trailing_members(obj, excess: int) -> tuple[object, int] | None:
+    """Last resort: drop trailing keys or items of the outermost container that has several members.
+
+    Returns (container, members dropped), or None when nothing can be dropped.
+    """
+    node = obj
+    while isinstance(node, (dict, list)) and len(node) == 1:
+        node = next(iter(node.values())) if isinstance(node, dict) else node[0]
+    if not isinstance(node, (dict, list)) or len(node) < 2:
+        return None
+    keys = list(node) if isinstance(node, dict) else list(range(len(node)))
+    removed = dropped = 0
+    while len(keys) > 1 and removed < excess:
+        key = keys.pop()
+        removed += len(_dumps_compact(node[key])) + (len(_dumps_compact(key)) + 2 if isinstance(node, dict) else 1)
+        del node[key]
+        dropped += 1
+    return node, dropped
+
+
+def fit_to_budget(obj, budget: int) -> str:
+    """Encode obj compactly within budget chars by dropping whole trailing records.
+
+    Each shortened list gets a "N more omitted" marker so the model knows the
+    result is partial; markers count against the budget as records go. Long
+    strings are halved only once no list can shrink, and whole trailing keys
+    go last. The result is always complete JSON, never a cut-off string.
+    """
+    omitted: dict[int, list] = {}  # id(container) -> [table, list or dict, count]
+    text = _dumps_compact(obj)
+    while True:
+        markers = sum(len(_omission_marker(c, n)) for _, c, n in omitted.values())
+        excess = len(text) + markers - budget
+        if excess <= 0:
+            break
+        # Trim the largest lists first, each by its share of the excess, in one pass
+        sized = sorted(((len(_dumps_compact(rows)), t, rows) for t, rows in _trim_candidates(obj) if len(rows) > 1),
+                       key=lambda c: c[0], reverse=True)
+        saved = 0
+        for rows_size, table, rows in sized:
+            if saved >= excess:
+                break
+            container = rows if table is None else table
+            per_row = rows_size / len(rows)
+            n = min(len(rows) - 1, max(1, int(-(-(excess - saved) // per_row))))
+            gain = n * per_row - (0 if id(container) in omitted else len(_omission_marker(container, n)))
+            if gain <= 0:
+                continue  # dropping rows here costs more in marker than it saves
+            del rows[-n:]
+            omitted.setdefault(id(container), [table, container, 0])[2] += n
+            saved += gain
+        if not saved and isinstance(obj, str) and len(obj) > 200:
+            obj = obj[:len(obj) // 2] + " …[truncated]"
+        elif not saved and not _truncate_longest_string(obj):
+            dropped = _drop_trailing_members(obj, excess)
+            if dropped is None:
+                return _dumps_compact({"error": f"result too large to show within {budget} characters"})
+            container, n = dropped
+            omitted.setdefault(id(container), [None, container, 0])[2] += n
+        text = _dumps_compact(obj)
+
+    for table, container, count in omitted.values():
+        if isinstance(container, list):
+            container.append(f"... {count} more omitted")
+        elif table is not None:
+            table["omitted"] = f"{count} more rows omitted"
+        else:
+            container["omitted_keys"] = f"{count} more keys omitted"
+    return _dumps_compact(obj)
+
+
+def encode_tool_result(result_text: str, budget: int = TOOL_RESULT_MAX_CHARS) -> str:
+    """Token-efficient rendering of a raw tool result for the model.
+
+    JSON results are tabulated and fitted to the budget record by record;
+    plain text is cut at a line boundary with an omission note.
+    """
+    try:
+        data = json.loads(result_text)
+    except (json.JSONDecodeError, ValueError):
+        if len(result_text) <= budget:
+            return result_text
+        cut = result_text.rfind("\n", 0, budget - 80)
+        cut = cut if cut > budget // 2 else budget - 80
+        return result_text[:cut] + f"\n... [{len(result_text) - cut} more characters omitted]"
+    return fit_to_budget(tabulate_records(data), budget)
+
+
+# Which public tools each agent gets
+PUBLIC_TOOLS_PER_AGENT = {
+    "scout": ["search_clinical_trials", "get_trial_details", "get_trial_details_batch", "search_pubmed",
+              "search_chembl_compound", "search_chembl_compound_batch"],
+    "connector": ["search_pubmed", "search_clinical_trials"],
+    "navigator": ["search_clinical_trials", "get_trial_details_batch", "search_openfda_orphan"],
+    "mobilizer": ["search_clinical_trials", "search_pubmed"],
+    "strategist": [],
+    "biologist": ["search_chembl_target", "search_chembl_target_batch", "search_chembl_bioactivity",
+                  "search_open_targets", "search_pubmed"],
+    "chemist": ["search_chembl_compound", "search_chembl_compound_batch", "search_chembl_target",
+                "search_chembl_target_batch", "search_chembl_bioactivity"],
+    "preclinician": ["search_chembl_compound", "search_chembl_compound_batch", "search_chembl_bioactivity", "search_pubmed"],
+}
+
+
+# ---------------------------------------------------------------------------
+# Agent conversation via Anthropic SDK
+# ---------------------------------------------------------------------------
+
+# Report fields apply_agent_output reads, per agent: name -> (JSON type, description)
+REPORT_FIELDS = {
+    "scout": {
+        "findings": ("array", "Research findings (papers, trials, news) with identifiers (NCT IDs, PMIDs), significance and source URLs"),
+        "knowledgeGraph": ("object", "Entities and relationships discovered: {nodes, edges}"),
+        "handoffs": ("array", "Leads for other agents: {to, note}"),
+    },
+    "connector": {
+        "contacts": ("array", "Researchers, clinicians and organizations to contact, each with an optional email_draft {subject, body}"),
+    },
+    "navigator": {
+        "regulatoryPathways": ("object", "Regulatory pathways keyed by pathway (orphan drug designation, expanded access, ...)"),
+    },
+    "mobilizer": {
+        "grantOpportunities": ("array", "Grants with funder, amount, deadline, eligibility and url"),
+        "fundraisingStrategy": ("object", "Fundraising plan"),
+        "advocacyConnections": ("array", "Patient advocacy organizations"),
+        "draftApplications": ("array", "Draft grant applications"),
+        "experimentFundingMatches": ("object", "Funding sources matched to proposed experiments"),
+        "pharmaPartnerships": ("array", "Potential industry partners"),
+        "entityFormation": ("object", "Foundation / entity formation guidance"),
+    },
+    "strategist": {
+        "weeklyBriefing": ("object", "{masterRoadmap, topPriorities, questionsForFamily}"),
+    },
+    "biologist": {
+        "targets": ("array", "Therapeutic targets with gene, uniprot_id, chembl_id, function and rationale"),
+        "disease_mechanism": ("string", "Disease mechanism in a few paragraphs"),
+        "target_ranking": ("array", "Targets in priority order"),
+        "pathway_map": ("object", "Pathways involved and how targets connect"),
+        "handoffs": ("array", "Leads for other agents: {to, note}"),
+    },
+    "chemist": {
+        "screening_summary": ("object", "What was screened and how"),
+        "repurposing_candidates": ("array", "Approved drugs worth repurposing, with chembl_id, mechanism and evidence"),
+        "novel_candidates": ("array", "Novel compounds of interest"),
+        "candidate_ranking": ("array", "Candidates in priority order"),
+        "handoffs": ("array", "Leads for other agents: {to, note}"),
+    },
+    "preclinician": {
+        "candidate_evaluations": ("array", "ADMET / safety evaluation per candidate"),
+        "experiment_design": ("object", "Proposed preclinical experiments"),
+        "cro_requirements": ("object", "What a CRO would need to run them"),
+    },
+}
+
+APPROVAL_ITEMS_SCHEMA = {
+    "type": "array",
+    "description": "Actions needing the family's approval (e.g. outreach emails): {type, title, content}; "
+                   "an outreach email's content is {to, subject, body}",
+    "items": {"type": "object", "properties": {
+        "type": {"type": "string"},
+        "title": {"type": "string"},
+        "content": {"type": ["object", "string"], "description": "{to, subject, body} for outreach_email, text otherwise"},
+    }},
+}
+
+submit_report_tools: dict[str, dict] = {}
+
+
+def submit_report_tool(agent_name: str) -> dict:
+    """The tool an agent's final report is delivered through; its input is exactly what apply_agent_output reads."""
+    tool = submit_report_tools.get(agent_name)
+    if tool is None:
+        fields = REPORT_FIELDS.get(agent_name, {})
+        properties = {name: {"type": kind, "description": desc} for name, (kind, desc) in fields.items()}
+        properties["approvalItems"] = APPROVAL_ITEMS_SCHEMA
+        tool = submit_report_tools[agent_name] = {
+            "name": "submit_report",
+            "description": f"Submit your final {agent_name} report. Call this exactly once, when your research is complete; "
+                           "the input is the full report object described in your instructions.",
+            "input_schema": {"type": "object", "properties": properties,
+                             "required": [f for f in OUTPUT_MINIMUMS.get(agent_name, {}) if f in fields]},
+        }
+    return tool
+
+
+def get_tools_for_agent(agent_name: str) -> list[dict]:
+    """Get Anthropic-format tool definitions for an agent.
+
+    Uses public API tools + web_search.
+    """
+    tools = []
+
+    # Add public API tools
+    for tool_name in PUBLIC_TOOLS_PER_AGENT.get(agent_name, []):
+        if tool_name in PUBLIC_TOOL_DEFS:
+            tools.append(PUBLIC_TOOL_DEFS[tool_name])
+
+    # Also add MCP tools if discovered
+    allowed = MCP_TOOLS_PER_AGENT.get(agent_name, [])
     for name in allowed:
         schema = mcp_tool_schemas.get(name)
         if schema:
@@ -629,10 +2429,31 @@ def get_tools_for_agent(agent_name: str) -> list[dict]:
     return deduped
 
 
-async def run_agent_conversation(agent_name: str, prompt: str, model: str, api_key: str | None = None) -> str:
-    """Run a multi-turn conversation with an agent, handling tool_use blocks."""
-    client = anthropic.AsyncAnthropic(**({"api_key": api_key} if api_key else {}))
-    tools = get_tools_for_agent(agent_name)
+AGENT_DEADLINE = float(os.environ.get("BEACON_AGENT_DEADLINE", "480"))      # seconds per agent, all iterations
+MISSION_DEADLINE = float(os.environ.get("BEACON_MISSION_DEADLINE", "600"))  # seconds for the whole agents phase
+FINALIZE_RESERVE = float(os.environ.get("BEACON_FINALIZE_RESERVE", "45"))   # time left when tools stop and the model must report
+FINALIZE_INSTRUCTION = ("Time is up: do not call any research tools. Using only the information gathered so far, "
+                        "call submit_report now with your final report in the required format.")
+
+# time.monotonic() deadline of the running agent; set per agent task in run_agent_loop
+agent_deadline: ContextVar[float | None] = ContextVar("agent_deadline", default=None)
+
+
+def deadline_remaining() -> float:
+    deadline = agent_deadline.get()
+    return float("inf") if deadline is None else deadline - time.monotonic()
+
+
+async def run_agent_conversation(agent_name: str, prompt: str, model: str, api_key: str | None = None) -> tuple[dict | str, int]:
+    """Run a multi-turn conversation with an agent, handling tool_use blocks.
+
+    The report arrives as the input of a submit_report call and is returned
+    as that dict, untouched. A text answer that doesn't parse gets one more
+    turn forcing submit_report. On the last allowed turn, or once the
+    agent's deadline is within FINALIZE_RESERVE, submit_report is forced
+    too, so a late iteration still ends in a mergeable report.
+    """
+    tools = [*get_tools_for_agent(agent_name), submit_report_tool(agent_name)]
     messages = [{"role": "user", "content": prompt}]
 
     # Check if using server tools (web_search) vs custom tools
@@ -642,44 +2463,200 @@ async def run_agent_conversation(agent_name: str, prompt: str, model: str, api_k
 
     tool_calls_count = 0
     max_turns = 15
+    force_submit = False
+    last_text = ""
     for _ in range(max_turns):
-        kwargs = {"model": model, "max_tokens": 16384, "messages": messages}
-        if custom_tools:
-            kwargs["tools"] = custom_tools
-        if server_tools:
-            # Anthropic API: server-side tools go in a separate field
-            kwargs.setdefault("tools", [])
-            kwargs["tools"].extend(server_tools)
-
-        if _ == 0:  # Log tools on first turn only
-            tool_names = [t.get("name", "?") for t in kwargs.get("tools", [])]
-            print(f"  🔧 {agent_name}: sending {len(tool_names)} tools: {tool_names}")
-        response = await client.messages.create(**kwargs)
-
-        # Check if there are tool_use blocks (custom tools only — web_search is handled server-side)
-        tool_uses = [b for b in response.content if b.type == "tool_use"]
-        if not tool_uses:
-            # Extract only actual text blocks (not web_search_tool_result or other types)
-            text_blocks = [b.text for b in response.content if b.type == "text"]
-            return "\n".join(text_blocks), tool_calls_count
-
-        # Process tool calls — route to public API tools or MCP proxy
-        tool_calls_count += len(tool_uses)
-        messages.append({"role": "assistant", "content": response.content})
-        tool_results = []
-        for tu in tool_uses:
-            if tu.name in PUBLIC_TOOL_DEFS:
-                result_text = await call_public_tool(tu.name, tu.input)
-            else:
-                result_text = await call_mcp_tool(tu.name, tu.input)
-            tool_results.append({
-                "type": "tool_result",
-                "tool_use_id": tu.id,
-                "content": result_text[:15000],
-            })
-        messages.append({"role": "user", "content": tool_results})
+        finalize = force_submit or _ == max_turns - 1 or deadline_remaining() < FINALIZE_RESERVE
+        with span("turn", agent=agent_name, turn=_, finalize=finalize):
+            kwargs = {"model": model, "max_tokens": 16384, "messages": messages}
+            if custom_tools:
+                kwargs["tools"] = custom_tools
+            if server_tools:
+                # Anthropic API: server-side tools go in a separate field
+                kwargs.setdefault("tools", [])
+                kwargs["tools"].extend(server_tools)
+            if finalize:
+                kwargs["tool_choice"] = {"type": "tool", "name": "submit_report"}
+            if finalize and not force_submit:
+                last = messages[-1]
+                content = last["content"] if isinstance(last["content"], list) else [{"type": "text", "text": last["content"]}]
+                messages[-1] = {"role": "user", "content": [*content, {"type": "text", "text": FINALIZE_INSTRUCTION}]}
+                print(f"  ⏱️  {agent_name}: finalizing on turn {_ + 1} ({deadline_remaining():.0f}s left)")
+
+            if _ == 0:  # Log tools on first turn only
+                tool_names = [t.get("name", "?") for t in kwargs.get("tools", [])]
+                print(f"  🔧 {agent_name}: sending {len(tool_names)} tools: {tool_names}")
+            response = await create_message(api_key, agent_name, **kwargs)
+
+            # Check if there are tool_use blocks (custom tools only — web_search is handled server-side)
+            tool_uses = [b for b in response.content if b.type == "tool_use"]
+            last_text = "\n".join(b.text for b in response.content if b.type == "text") or last_text
+            report = next((tu for tu in tool_uses if tu.name == "submit_report"), None)
+            if report is not None:
+                return report.input, tool_calls_count
+            if not tool_uses:
+                # Extract only actual text blocks (not web_search_tool_result or other types)
+                text = "\n".join(b.text for b in response.content if b.type == "text")
+                if finalize or (await run_cpu(parse_agent_output, agent_name, text))[0] is not None:
+                    return text, tool_calls_count
+                # Answered in prose instead of submitting: one more turn, forced through submit_report
+                print(f"  ↩️  {agent_name}: report came back as unparseable text, forcing submit_report")
+                messages.append({"role": "assistant", "content": response.content})
+                messages.append({"role": "user", "content": "Submit that report now by calling the submit_report tool."})
+                force_submit = True
+                continue
 
-    return "(max tool turns reached)", tool_calls_count
+            # Process tool calls — route to public API tools or MCP proxy
+            tool_calls_count += len(tool_uses)
+            messages.append({"role": "assistant", "content": response.content})
+            tool_results = []
+            for tu in tool_uses:
+                call = call_public_tool(tu.name, tu.input) if tu.name in PUBLIC_TOOL_DEFS else call_mcp_tool(tu.name, tu.input)
+                try:
+                    # Leave the reserve for the finalizing turn; an unbounded tool call would eat it
+                    budget = deadline_remaining() - FINALIZE_RESERVE
+                    result_text = await asyncio.wait_for(call, max(1.0, budget) if budget != float("inf") else None)
+                except asyncio.TimeoutError:
+                    result_text = json.dumps({"error": f"{tu.name} timed out: agent deadline reached"})
+                tool_results.append({
+                    "type": "tool_result",
+                    "tool_use_id": tu.id,
+                    "content": encode_tool_result(result_text),
+                })
+            messages.append({"role": "user", "content": tool_results})
+
+    # Every turn went to tools and none submitted a report (or a replayed cassette ran out): merge what text there was
+    print(f"  ⚠️  {agent_name}: no report after {max_turns} turns")
+    return last_text, tool_calls_count
+
+
+# ---------------------------------------------------------------------------
+# Approval store (deduplicated by content, indexed by id and status)
+# ---------------------------------------------------------------------------
+
+APPROVAL_STATUSES = ("pending", "approved", "rejected", "deferred")
+APPROVAL_ACTIONS = {"approve": "approved", "reject": "rejected", "defer": "deferred"}
+APPROVAL_IDENTITY_FIELDS = ("type", "title", "content")
+APPROVALS_IN_STATE = 20  # pending items inlined in /api/state; everything else via /api/approvals
+APPROVAL_PAGE_MAX = 200
+
+
+def approval_id(item: dict) -> str:
+    """Stable id from an item's content: the same draft proposed again in a later iteration gets the same id."""
+    identity = {k: item.get(k) for k in APPROVAL_IDENTITY_FIELDS}
+    canonical = json.dumps(identity, sort_keys=True, default=str, ensure_ascii=False)
+    return "apv-" + hashlib.sha1(canonical.encode()).hexdigest()[:12]
+
+
+class ApprovalStore:
+    """Index over shared_plan["approvals"]: one record per distinct item, looked up by id, grouped by status.
+
+    The records list is the plan's own list, so snapshots and the state bus
+    carry it unchanged; the indexes are rebuilt from it whenever the plan is
+    replaced (see current_approvals).
+    """
+
+    def __init__(self, records: list[dict]):
+        self.records = records
+        self.index: dict[str, int] = {}
+        self.by_status: dict[str, dict[str, None]] = {status: {} for status in APPROVAL_STATUSES}  # ordered id sets
+        for pos, record in enumerate(records):
+            self.index[record["id"]] = pos
+            self.by_status.setdefault(record.get("status", "pending"), {})[record["id"]] = None
+
+    def merge(self, agent_name: str, items: list, now: str) -> int:
+        """Add new items as pending; repeats only bump `seen`. Returns how many were new."""
+        added = 0
+        for item in items:
+            if not isinstance(item, dict):
+                continue
+            aid = approval_id(item)
+            pos = self.index.get(aid)
+            if pos is not None:
+                self.records[pos] = {**self.records[pos], "seen": self.records[pos].get("seen", 1) + 1, "last_seen": now}
+                continue
+            self.index[aid] = len(self.records)
+            self.records.append({**item, "id": aid, "source_id": item.get("id"), "agent": item.get("agent") or agent_name,
+                                 "status": "pending", "created_at": now, "updated_at": now, "last_seen": now, "seen": 1})
+            self.by_status["pending"][aid] = None
+            added += 1
+        return added
+
+    def get(self, aid: str) -> dict | None:
+        pos = self.index.get(aid)
+        return None if pos is None else self.records[pos]
+
+    def set_status(self, aid: str, status: str, note: str = "") -> dict | None:
+        pos = self.index.get(aid)
+        if pos is None:
+            return None
+        record = self.records[pos]
+        self.by_status[record["status"]].pop(aid, None)
+        record = self.records[pos] = {**record, "status": status, "updated_at": datetime.now().isoformat(),
+                                      **({"note": note} if note else {})}
+        self.by_status[status][aid] = None
+        return record
+
+    def counts(self) -> dict[str, int]:
+        return {status: len(ids) for status, ids in self.by_status.items()}
+
+    def pending(self, limit: int) -> list[dict]:
+        return [self.records[self.index[aid]] for aid in islice(self.by_status["pending"], limit)]
+
+    def page(self, status: str | None = None, agent: str | None = None, kind: str | None = None,
+             offset: int = 0, limit: int = 50) -> dict:
+        ids = self.by_status[status] if status else self.index
+        matches = (self.records[self.index[aid]] for aid in ids)
+        if agent or kind:
+            matches = [r for r in matches if (not agent or r.get("agent") == agent) and (not kind or r.get("type") == kind)]
+            total, items = len(matches), matches[offset:offset + limit]
+        else:
+            total, items = len(ids), list(islice(matches, offset, offset + limit))
+        return {"items": items, "total": total, "offset": offset, "limit": limit, "counts": self.counts()}
+
+
+approval_store = ApprovalStore([])
+
+
+def current_approvals() -> ApprovalStore:
+    """The store for the current shared_plan, re-indexed when a new mission replaced the plan."""
+    global approval_store
+    if approval_store.records is not shared_plan["approvals"]:
+        approval_store = ApprovalStore(shared_plan["approvals"])
+    return approval_store
+
+
+def sync_approval_view(store: ApprovalStore):
+    """app_state carries only the first pending items and the counts, so polls stay small however many accumulate."""
+    app_state["approvals"] = store.pending(APPROVALS_IN_STATE)
+    app_state["approval_counts"] = store.counts()
+
+
+async def set_approval_status(approval_id: str, status: str, note: str = "", mission_id: str | None = None) -> dict | None:
+    async with state_lock:
+        if mission_id and current_mission_id != mission_id:
+            return None
+        store = current_approvals()
+        record = store.set_status(approval_id, status, note)
+        if record is not None:
+            sync_approval_view(store)
+            publish("state", "plan")
+    return record
+
+
+async def remote_approvals() -> ApprovalStore:
+    """Store over the plan published by the worker that runs the mission."""
+    stored = await state_bus.get("snapshot:plan")
+    plan = json_loads(stored.partition(b"\n")[2]) if stored else {}
+    return ApprovalStore(plan.get("approvals", []))
+
+
+async def follow_approval_updates():
+    """Apply approve/reject/defer requests that reached another worker to the mission this worker runs."""
+    async for message in state_bus.subscribe("approvals"):
+        update = json_loads(message)
+        if mission_owner == BOOT_ID:
+            await set_approval_status(update["id"], update["status"], update.get("note", ""), mission_id=update["mission_id"])
 
 
 # ---------------------------------------------------------------------------
@@ -687,7 +2664,7 @@ async def run_agent_conversation(agent_name: str, prompt: str, model: str, api_k
 # ---------------------------------------------------------------------------
 
 async def add_agent_update(agent_name: str, message: str, update_type: str = "status", completed: bool = False, mission_id: str = None):
-    async with state_lock:
+    async with agent_lock(agent_name):
         if mission_id and current_mission_id != mission_id:
             return False  # Stale agent, stop writing
         agent = app_state["agents"].get(agent_name, {})
@@ -700,11 +2677,12 @@ async def add_agent_update(agent_name: str, message: str, update_type: str = "st
             "completed": completed,
         })
         app_state["agents"][agent_name] = agent
+        publish("state")
     return True
 
 
 async def update_agent_status(agent_name: str, status: str, current_task: str = "", mission_id: str = None):
-    async with state_lock:
+    async with agent_lock(agent_name):
         if mission_id and current_mission_id != mission_id:
             return False  # Stale agent
         if agent_name not in app_state["agents"]:
@@ -713,6 +2691,7 @@ async def update_agent_status(agent_name: str, status: str, current_task: str =
         app_state["agents"][agent_name]["lastRun"] = datetime.now().isoformat()
         if current_task:
             app_state["agents"][agent_name]["current_task"] = current_task
+        publish("state")
     return True
 
 
@@ -720,7 +2699,7 @@ def build_prompt(agent_name: str, plan: dict, iteration: int, num_iterations: in
     """Build prompt with shared plan context and iteration instructions."""
     prompt_path = AGENTS_DIR / f"{agent_name}.md"
     if not prompt_path.exists():
-        return f"You are the {agent_name} agent. Respond with valid JSON."
+        return f"You are the {agent_name} agent. Deliver your report by calling the submit_report tool."
     prompt = prompt_path.read_text()
 
     disease = plan["mission"].get("disease", "")
@@ -751,14 +2730,21 @@ ITERATION: {iteration} of {num_iterations - 1} (0-indexed)
 
 {f"=== CONTEXT FROM OTHER AGENTS ==={knowledge_context}" if knowledge_context else "No other agent data available yet (you are running in parallel)."}
 
-Output ONLY valid JSON. No markdown fences, no explanation."""
+When your research is complete, deliver the report described above by calling the submit_report tool
+(its input is the report object). Do not write the report out as text."""
 
 
-def merge_output(agent_name: str, raw_output: str):
-    """Parse agent output and merge into shared_plan + app_state. Synchronous, caller holds lock."""
+def parse_agent_output(agent_name: str, raw_output: dict | str) -> tuple[dict | None, str]:
+    """Extract the JSON report from agent text. Pure and CPU-bound: safe to run off the event loop.
+
+    Returns (data, output); data is None when no JSON could be recovered.
+    A submit_report input (already a dict) is passed through as is.
+    """
+    if isinstance(raw_output, dict):
+        return raw_output, ""
     output = raw_output
     try:
-        parsed = json.loads(raw_output)
+        parsed = json_loads(raw_output)
         if "result" in parsed and isinstance(parsed["result"], str):
             output = parsed["result"]
     except json.JSONDecodeError:
@@ -771,7 +2757,7 @@ def merge_output(agent_name: str, raw_output: str):
 
     # Try to extract JSON object/array
     try:
-        json.loads(output)
+        json_loads(output)
     except (json.JSONDecodeError, ValueError):
         for start_char, end_char in [('{', '}'), ('[', ']')]:
             start_idx = output.find(start_char)
@@ -781,18 +2767,30 @@ def merge_output(agent_name: str, raw_output: str):
             if end_idx > start_idx:
                 candidate = output[start_idx:end_idx + 1]
                 try:
-                    json.loads(candidate)
+                    json_loads(candidate)
                     output = candidate
                     break
                 except (json.JSONDecodeError, ValueError):
                     pass
 
     try:
-        data = json.loads(output)
-    except json.JSONDecodeError as e:
-        print(f"  ⚠️  {agent_name}: JSON parse failed: {e}")
-        print(f"  ⚠️  {agent_name}: output length={len(output)}, first 200 repr: {repr(output[:200])}")
-        print(f"  ⚠️  {agent_name}: last 200 repr: {repr(output[-200:])}")
+        data = json_loads(output)
+    except json.JSONDecodeError:
+        return None, output
+    return data, output
+
+
+def merge_output(agent_name: str, raw_output: dict | str):
+    """Parse agent output and merge into shared_plan + app_state. Synchronous, caller holds lock."""
+    data, output = parse_agent_output(agent_name, raw_output)
+    return apply_agent_output(agent_name, data, output)
+
+
+def apply_agent_output(agent_name: str, data: dict | None, output: str):
+    """Merge parsed agent output into shared_plan + app_state. Synchronous, caller holds lock."""
+    if data is None:
+        PARSE_FAILURES.inc(agent=agent_name)
+        print(f"  ⚠️  {agent_name}: report was not valid JSON ({len(output)} chars), nothing merged")
         return output
 
     print(f"  📦 {agent_name}: parsed JSON with keys: {list(data.keys()) if isinstance(data, dict) else 'array'}")
@@ -863,19 +2861,187 @@ def merge_output(agent_name: str, raw_output: str):
 
     # Handle approval items
     approval_items = data.get("approvalItems", [])
-    if approval_items:
-        shared_plan["approvals"].extend(approval_items)
-        app_state.setdefault("approvals", []).extend(approval_items)
+    if isinstance(approval_items, list) and approval_items:
+        store = current_approvals()
+        added = store.merge(agent_name, approval_items, now)
+        sync_approval_view(store)
+        if added:
+            print(f"  📋 {agent_name}: {added} new approval item(s)")
 
     shared_plan["log"].append({
         "agent": agent_name,
         "timestamp": now,
         "summary": f"{agent_name} completed update",
     })
+    publish("state", "plan")
 
     return output
 
 
+# ---------------------------------------------------------------------------
+# Model cascade (fast model first, escalate when its report fails validation)
+# ---------------------------------------------------------------------------
+
+FAST_MODEL = "claude-haiku-4-5-20251001"
+CASCADE_ENABLED = os.environ.get("BEACON_MODEL_CASCADE", "1") != "0"
+CASCADE_AGENTS = ("scout", "navigator", "biologist", "chemist")
+
+# Minimum size of the report sections a fast-model iteration must reach to be accepted
+OUTPUT_MINIMUMS = {
+    "scout": {"findings": 3},
+    "connector": {"contacts": 2},
+    "navigator": {"regulatoryPathways": 1},
+    "mobilizer": {"grantOpportunities": 2},
+    "strategist": {"weeklyBriefing": 1},
+    "biologist": {"targets": 2},
+    "chemist": {"repurposing_candidates": 2},
+    "preclinician": {"candidate_evaluations": 1},
+}
+
+# Identifier fields (keys compared lowercased, without underscores) and the shape a resolvable ID has
+ID_PATTERNS = {
+    "nctid": re.compile(r"NCT\d{8}"),
+    "pmid": re.compile(r"(PMID:?\s*)?\d{1,9}"),
+    "chemblid": re.compile(r"CHEMBL\d+"),
+    "uniprotid": re.compile(r"[OPQ][0-9][A-Z0-9]{3}[0-9]|[A-NR-Z][0-9]([A-Z][A-Z0-9]{2}[0-9]){1,2}"),
+}
+
+cascade_stats: dict[str, dict[str, int]] = {}
+
+
+def _malformed_ids(obj, found: list[str]):
+    if isinstance(obj, dict):
+        for k, v in obj.items():
+            pattern = ID_PATTERNS.get(k.lower().replace("_", ""))
+            # Values without digits are placeholders ("unknown", "N/A"), not attempted identifiers
+            if pattern and isinstance(v, str) and any(c.isdigit() for c in v) and not pattern.fullmatch(v.strip()):
+                found.append(f"{k}={v[:20]}")
+            else:
+                _malformed_ids(v, found)
+    elif isinstance(obj, list):
+        for v in obj:
+            _malformed_ids(v, found)
+
+
+def validate_agent_output(agent_name: str, data) -> list[str]:
+    """Problems that make a report worse than what the stronger model would return; empty when acceptable."""
+    if data is None:
+        return ["unparseable"]
+    if not isinstance(data, dict):
+        return ["not a JSON object"]
+    problems = []
+    for key, minimum in OUTPUT_MINIMUMS.get(agent_name, {}).items():
+        value = data.get(key)
+        size = len(value) if isinstance(value, (list, dict)) else 0
+        if size < minimum:
+            problems.append(f"{key}: {size} < {minimum}")
+    malformed: list[str] = []
+    _malformed_ids(data, malformed)
+    if malformed:
+        problems.append(f"malformed ids: {', '.join(malformed[:3])}")
+    return problems
+
+
+def cascade_rates() -> dict[str, dict]:
+    return {
+        agent: {**counts, "escalation_rate": round(counts["escalated"] / total, 3) if (total := counts["accepted"] + counts["escalated"]) else 0.0}
+        for agent, counts in cascade_stats.items()
+    }
+
+
+async def run_iteration_models(agent_name: str, prompt: str, model: str, api_key: str | None = None) -> tuple[dict | None, str, int]:
+    """Run one iteration's conversation and parse it, trying FAST_MODEL first for cascaded agents.
+
+    Returns (data, output, tool_calls_count) as parse_agent_output would,
+    with tool calls summed across both attempts when escalated.
+    """
+    tool_calls = 0
+    if CASCADE_ENABLED and agent_name in CASCADE_AGENTS and model != FAST_MODEL:
+        counts = cascade_stats.setdefault(agent_name, {"accepted": 0, "escalated": 0})
+        raw_output, tool_calls = await run_agent_conversation(agent_name, prompt, FAST_MODEL, api_key=api_key)
+        data, output = await parse_report(agent_name, raw_output)
+        problems = validate_agent_output(agent_name, data)
+        if not problems or deadline_remaining() < 2 * FINALIZE_RESERVE:
+            counts["accepted"] += 1
+            MODEL_CASCADE.inc(agent=agent_name, outcome="accepted")
+            set_span_attrs(model=FAST_MODEL, escalated=False, validation=problems)
+            return data, output, tool_calls
+        counts["escalated"] += 1
+        MODEL_CASCADE.inc(agent=agent_name, outcome="escalated")
+        set_span_attrs(escalated=True, validation=problems)
+        print(f"  ⤴️  {agent_name}: {FAST_MODEL} report failed validation ({'; '.join(problems)}), escalating to {model}")
+
+    raw_output, count = await run_agent_conversation(agent_name, prompt, model, api_key=api_key)
+    data, output = await parse_report(agent_name, raw_output)
+    return data, output, tool_calls + count
+
+
+async def parse_report(agent_name: str, raw_output: dict | str) -> tuple[dict | None, str]:
+    """parse_agent_output, skipping the worker thread for submit_report dicts that need no parsing."""
+    if isinstance(raw_output, dict):
+        return raw_output, ""
+    return await run_cpu(parse_agent_output, agent_name, raw_output)
+
+
+# ---------------------------------------------------------------------------
+# Adaptive iterations (skip when inputs are unchanged, extend on major new data)
+# ---------------------------------------------------------------------------
+
+ITERATION_INPUT_WAIT = float(os.environ.get("BEACON_ITERATION_INPUT_WAIT", "30"))  # seconds to wait for other agents' new data
+MAJOR_CHANGE_SECTIONS = 2  # other agents' finished sections, new or revised since the last pass, that earn an extra one
+MAX_EXTRA_ITERATIONS = 1
+
+
+def input_fingerprint(agent_name: str, knowledge: dict) -> dict[str, str]:
+    """Hash of each other agent's section exactly as build_prompt shows it (first 4000 chars, minus updated_at)."""
+    return {
+        other: hashlib.sha1(json.dumps({k: v for k, v in section.items() if k != "updated_at"}, indent=2)[:4000].encode()).hexdigest()[:12]
+        for other, section in knowledge.items()
+        if other != agent_name and section.get("updated_at")
+    }
+
+
+def changed_sections(before: dict[str, str], after: dict[str, str]) -> list[str]:
+    return sorted(name for name, digest in after.items() if before.get(name) != digest)
+
+
+def settled_sections(sections: list[str]) -> list[str]:
+    """Sections whose agent has finished: an extra pass on them sees final reports, not work still in progress."""
+    return [name for name in sections if app_state["agents"].get(name, {}).get("status") == "complete"]
+
+
+async def current_fingerprint(agent_name: str) -> dict[str, str]:
+    async with state_lock:
+        knowledge = dict(shared_plan["knowledge"])
+    return await run_cpu(input_fingerprint, agent_name, knowledge)
+
+
+async def wait_for_new_inputs(agent_name: str, last_inputs: dict[str, str]) -> list[str]:
+    """Sections that changed since the last pass, waiting up to ITERATION_INPUT_WAIT while other agents are still working."""
+    deadline = time.monotonic() + min(ITERATION_INPUT_WAIT, deadline_remaining() - FINALIZE_RESERVE)
+    while True:
+        changed = changed_sections(last_inputs, await current_fingerprint(agent_name))
+        still_working = any(a != agent_name and s.get("status") == "working" for a, s in app_state["agents"].items())
+        remaining = deadline - time.monotonic()
+        if changed or not still_working or remaining <= 0:
+            return changed
+        await wait_for_publish("plan", remaining)
+
+
+async def record_iteration_decision(agent_name: str, action: str, iteration: int, changed: list[str], mission_id: str = None):
+    """Report a run/skip/deadline/extend decision in app_state["agents"][agent]["iterations"]."""
+    if action != "run":
+        ITERATION_DECISIONS.inc(agent=agent_name, action=action)
+    async with agent_lock(agent_name):
+        if mission_id and current_mission_id != mission_id:
+            return
+        stats = app_state["agents"].setdefault(agent_name, {}).setdefault(
+            "iterations", {"run": 0, "skipped": 0, "extended": 0, "decisions": []})
+        stats[{"run": "run", "skip": "skipped", "deadline": "skipped", "extend": "extended"}[action]] += 1
+        stats["decisions"].append({"iteration": iteration, "action": action, "changed": changed})
+        publish("state")
+
+
 # ---------------------------------------------------------------------------
 # Agent loop
 # ---------------------------------------------------------------------------
@@ -892,8 +3058,22 @@ TASK_DESCRIPTIONS = {
 }
 
 
-async def run_agent_loop(agent_name: str, demo: bool = True, mission_id: str = None, api_key: str | None = None):
-    """Run all iterations of an agent."""
+async def report_queue_position(agent_name: str, mission_id: str | None, position: int | None, eta: float = 0.0):
+    """Show where an agent waits for an iteration slot in /api/state (agents.<name>.queue); None once admitted."""
+    async with agent_lock(agent_name):
+        if mission_id and current_mission_id != mission_id:
+            return
+        agent_data = app_state["agents"].setdefault(agent_name, {})
+        queue = None if position is None else {"position": position, "eta_s": eta}
+        if agent_data.get("queue") != queue:
+            agent_data["queue"] = queue
+            publish("state")
+
+
+async def run_agent_loop(agent_name: str, demo: bool = True, mission_id: str = None, api_key: str | None = None,
+                         deadline: float | None = None):
+    """Run all iterations of an agent, within AGENT_DEADLINE and the mission's `deadline` (time.monotonic())."""
+    agent_deadline.set(min(time.monotonic() + AGENT_DEADLINE, deadline or float("inf")))
     await update_agent_status(agent_name, "working", TASK_DESCRIPTIONS.get(agent_name, "Working..."), mission_id=mission_id)
     alive = await add_agent_update(agent_name, f"Starting {agent_name} agent...", mission_id=mission_id)
     if alive is False:
@@ -901,11 +3081,14 @@ async def run_agent_loop(agent_name: str, demo: bool = True, mission_id: str = N
 
     models = DEMO_MODELS if demo else MODELS
     iterations = DEMO_ITERATIONS if demo else ITERATIONS
-    num_iterations = iterations[agent_name]
+    planned = num_iterations = iterations[agent_name]
     model = models[agent_name]
+    last_inputs: dict[str, str] | None = None  # input fingerprint the previous pass was prompted with
+    changed: list[str] = []
 
     try:
-        for i in range(num_iterations):
+        i = 0
+        while i < num_iterations:
             # Check if mission has changed
             if mission_id and current_mission_id != mission_id:
                 print(f"  🛑 {agent_name} aborted — mission changed")
@@ -913,67 +3096,205 @@ async def run_agent_loop(agent_name: str, demo: bool = True, mission_id: str = N
 
             if agent_name == "strategist" and i > 0:
                 await add_agent_update(agent_name, "Waiting for more agent data...", mission_id=mission_id)
-                await asyncio.sleep(5)
-
-            await add_agent_update(agent_name, f"Iteration {i+1}/{num_iterations}...", mission_id=mission_id)
-
-            async with state_lock:
-                if mission_id and current_mission_id != mission_id:
-                    return
-                prompt = build_prompt(agent_name, shared_plan, i, num_iterations)
+                await asyncio.sleep(max(0.0, min(5, deadline_remaining() - FINALIZE_RESERVE)))
+
+            if last_inputs is not None:
+                changed = await wait_for_new_inputs(agent_name, last_inputs)
+                if not changed:
+                    print(f"  ⏭️  {agent_name}: no new inputs since iteration {i}, skipping {num_iterations - i} iteration(s)")
+                    await add_agent_update(agent_name, "No new data from other agents — skipping remaining iterations", mission_id=mission_id)
+                    for skipped in range(i, num_iterations):
+                        await record_iteration_decision(agent_name, "skip", skipped, [], mission_id=mission_id)
+                    break
 
-            raw_output, tc_count = await run_agent_conversation(agent_name, prompt, model, api_key=api_key)
+            # Not enough time left for a pass that does more than report; the first pass always runs
+            if i > 0 and deadline_remaining() < 2 * FINALIZE_RESERVE:
+                print(f"  ⏱️  {agent_name}: deadline reached, skipping {num_iterations - i} iteration(s)")
+                await add_agent_update(agent_name, "Time budget reached — finishing with current findings", mission_id=mission_id)
+                for skipped in range(i, num_iterations):
+                    await record_iteration_decision(agent_name, "deadline", skipped, [], mission_id=mission_id)
+                break
 
-            # Check again after long API call
-            if mission_id and current_mission_id != mission_id:
-                print(f"  🛑 {agent_name} aborted after API call — mission changed")
-                return
+            await add_agent_update(agent_name, f"Iteration {i+1}/{num_iterations}...", mission_id=mission_id)
+            with span("iteration", agent=agent_name, iteration=i, model=model):
+                iteration_start = time.perf_counter()
+
+                async with state_lock:
+                    if mission_id and current_mission_id != mission_id:
+                        return
+                    # Knowledge entries are replaced, never mutated, so a shallow copy is a stable view
+                    plan_view = {"mission": dict(shared_plan["mission"]), "knowledge": dict(shared_plan["knowledge"])}
+                prompt = await run_cpu(build_prompt, agent_name, plan_view, i, num_iterations)
+                last_inputs = await run_cpu(input_fingerprint, agent_name, plan_view["knowledge"])
+
+                # Later passes only wait for a slot while there is still time for them; the first always runs
+                wait_limit = max(0.0, deadline_remaining() - 2 * FINALIZE_RESERVE) if i > 0 else None
+                try:
+                    async with agent_slots.slot(key_id(api_key), timeout=wait_limit,
+                                                on_wait=partial(report_queue_position, agent_name, mission_id)):
+                        await report_queue_position(agent_name, mission_id, None)
+                        data, output, tc_count = await run_iteration_models(agent_name, prompt, model, api_key=api_key)
+                except asyncio.TimeoutError:
+                    await report_queue_position(agent_name, mission_id, None)
+                    print(f"  ⏱️  {agent_name}: no agent slot before the deadline, skipping {num_iterations - i} iteration(s)")
+                    await add_agent_update(agent_name, "Busy — finishing with current findings", mission_id=mission_id)
+                    for skipped in range(i, num_iterations):
+                        await record_iteration_decision(agent_name, "deadline", skipped, [], mission_id=mission_id)
+                    break
 
-            async with state_lock:
+                # Check again after long API call
                 if mission_id and current_mission_id != mission_id:
+                    print(f"  🛑 {agent_name} aborted after API call — mission changed")
                     return
-                merge_output(agent_name, raw_output)
-                agent_data = app_state["agents"].setdefault(agent_name, {})
-                agent_data["tool_calls_count"] = agent_data.get("tool_calls_count", 0) + tc_count
-
-            # Add status updates based on merged data
-            async with state_lock:
-                knowledge = shared_plan["knowledge"].get(agent_name, {})
-            if agent_name == "scout":
-                findings = knowledge.get("findings", [])
-                await add_agent_update(agent_name, f"Found {len(findings)} research findings", "status", True, mission_id=mission_id)
-                for f in findings[:3]:
-                    await add_agent_update(agent_name, f.get("title", "Finding"), "finding", True, mission_id=mission_id)
-            elif agent_name == "connector":
-                contacts = knowledge.get("contacts", [])
-                await add_agent_update(agent_name, f"Identified {len(contacts)} outreach targets", "status", True, mission_id=mission_id)
-            elif agent_name == "navigator":
-                await add_agent_update(agent_name, "Regulatory pathway mapping complete", "status", True, mission_id=mission_id)
-            elif agent_name == "mobilizer":
-                grants = knowledge.get("grants", [])
-                await add_agent_update(agent_name, f"Found {len(grants)} grant opportunities", "status", True, mission_id=mission_id)
-            elif agent_name == "strategist":
-                await add_agent_update(agent_name, "Weekly briefing ready", "finding", True, mission_id=mission_id)
-            elif agent_name == "biologist":
-                targets = knowledge.get("targets", [])
-                await add_agent_update(agent_name, f"Identified {len(targets)} therapeutic targets", "status", True, mission_id=mission_id)
-            elif agent_name == "chemist":
-                candidates = knowledge.get("repurposing_candidates", [])
-                await add_agent_update(agent_name, f"Found {len(candidates)} repurposing candidates", "status", True, mission_id=mission_id)
-            elif agent_name == "preclinician":
-                evals = knowledge.get("candidate_evaluations", [])
-                await add_agent_update(agent_name, f"Evaluated {len(evals)} candidates", "status", True, mission_id=mission_id)
 
+                async with state_lock:
+                    if mission_id and current_mission_id != mission_id:
+                        return
+                    apply_agent_output(agent_name, data, output)
+                    agent_data = app_state["agents"].setdefault(agent_name, {})
+                    agent_data["tool_calls_count"] = agent_data.get("tool_calls_count", 0) + tc_count
+                    publish("state")
+
+                # Add status updates based on merged data
+                async with state_lock:
+                    knowledge = shared_plan["knowledge"].get(agent_name, {})
+                if agent_name == "scout":
+                    findings = knowledge.get("findings", [])
+                    await add_agent_update(agent_name, f"Found {len(findings)} research findings", "status", True, mission_id=mission_id)
+                    for f in findings[:3]:
+                        await add_agent_update(agent_name, f.get("title", "Finding"), "finding", True, mission_id=mission_id)
+                elif agent_name == "connector":
+                    contacts = knowledge.get("contacts", [])
+                    await add_agent_update(agent_name, f"Identified {len(contacts)} outreach targets", "status", True, mission_id=mission_id)
+                elif agent_name == "navigator":
+                    await add_agent_update(agent_name, "Regulatory pathway mapping complete", "status", True, mission_id=mission_id)
+                elif agent_name == "mobilizer":
+                    grants = knowledge.get("grants", [])
+                    await add_agent_update(agent_name, f"Found {len(grants)} grant opportunities", "status", True, mission_id=mission_id)
+                elif agent_name == "strategist":
+                    await add_agent_update(agent_name, "Weekly briefing ready", "finding", True, mission_id=mission_id)
+                elif agent_name == "biologist":
+                    targets = knowledge.get("targets", [])
+                    await add_agent_update(agent_name, f"Identified {len(targets)} therapeutic targets", "status", True, mission_id=mission_id)
+                elif agent_name == "chemist":
+                    candidates = knowledge.get("repurposing_candidates", [])
+                    await add_agent_update(agent_name, f"Found {len(candidates)} repurposing candidates", "status", True, mission_id=mission_id)
+                elif agent_name == "preclinician":
+                    evals = knowledge.get("candidate_evaluations", [])
+                    await add_agent_update(agent_name, f"Evaluated {len(evals)} candidates", "status", True, mission_id=mission_id)
+
+                ITERATION_SECONDS.observe(time.perf_counter() - iteration_start, agent=agent_name)
             print(f"  ✅ {agent_name} iteration {i+1}/{num_iterations} complete")
+            await record_iteration_decision(agent_name, "run", i, changed, mission_id=mission_id)
+            i += 1
+
+            # The last planned pass missed finished work from several other agents (new sections or revisions)
+            if (i == num_iterations and not demo and num_iterations < planned + MAX_EXTRA_ITERATIONS
+                    and deadline_remaining() > 2 * FINALIZE_RESERVE):
+                changed = settled_sections(changed_sections(last_inputs, await current_fingerprint(agent_name)))
+                if len(changed) >= MAJOR_CHANGE_SECTIONS:
+                    num_iterations += 1
+                    print(f"  ➕ {agent_name}: new data from {', '.join(changed)}, adding iteration {num_iterations}")
+                    await add_agent_update(agent_name, f"Major new data from {', '.join(changed)} — running an extra iteration", mission_id=mission_id)
+                    await record_iteration_decision(agent_name, "extend", i, changed, mission_id=mission_id)
 
         if mission_id and current_mission_id != mission_id:
             return
         await update_agent_status(agent_name, "complete", mission_id=mission_id)
+        on_agent_settled(agent_name, api_key)
     except Exception as e:
         traceback.print_exc()
         if mission_id and current_mission_id == mission_id:
             await update_agent_status(agent_name, "error", mission_id=mission_id)
             await add_agent_update(agent_name, f"Error: {str(e)[:100]}", "status", False, mission_id=mission_id)
+            on_agent_settled(agent_name, api_key)
+
+
+# ---------------------------------------------------------------------------
+# Synthesis digests (map step, generated as each agent settles)
+# ---------------------------------------------------------------------------
+
+DIGEST_MODEL = "claude-haiku-4-5-20251001"
+DIGEST_INPUT_CHARS = 40000     # knowledge sent to one digest call
+DIGEST_FALLBACK_CHARS = 15000  # raw knowledge used in the reduce when a digest isn't ready
+DIGEST_GRACE = 3.0             # seconds the reduce waits for digests already in flight
+DIGEST_CACHE_SIZE = 200
+
+# Content hash of (disease, agent, knowledge) -> digest text. Unchanged knowledge is never re-digested.
+digest_cache: OrderedDict[str, str] = OrderedDict()
+digest_tasks: dict[str, asyncio.Task] = {}
+
+
+def fit_knowledge(knowledge: dict, budget: int) -> str:
+    """A copy of an agent's knowledge cut to budget by whole records, so it stays valid JSON."""
+    return encode_tool_result(dumps_text(knowledge), budget)
+
+
+def knowledge_hash(disease: str, agent_name: str, knowledge: dict) -> str:
+    content = {k: v for k, v in knowledge.items() if k != "updated_at"}
+    return hashlib.sha1(dumps_bytes({"disease": disease, "agent": agent_name, "knowledge": content})).hexdigest()
+
+
+async def _generate_digest(key: str, agent_name: str, knowledge: dict, disease: str, api_key: str | None) -> str:
+    data = await run_cpu(fit_knowledge, knowledge, DIGEST_INPUT_CHARS)
+    response = await create_message(
+        api_key, f"digest:{agent_name}",
+        model=DIGEST_MODEL,
+        max_tokens=800,
+        messages=[{"role": "user", "content": f"""You are preparing input for a family briefing about {disease}.
+Condense the {agent_name} agent's findings below into at most 250 words of key facts:
+the most important findings with their identifiers (NCT IDs, PMIDs, gene and compound names, grant names, amounts, dates),
+ranked by importance, plus any concrete next actions. Plain bullet points, no preamble.
+
+=== {agent_name.upper()} FINDINGS ===
+{data}"""}],
+    )
+    digest = "\n".join(b.text for b in response.content if b.type == "text")
+    digest_cache[key] = digest
+    while len(digest_cache) > DIGEST_CACHE_SIZE:
+        digest_cache.popitem(last=False)
+    return digest
+
+
+def _log_digest_failure(agent_name: str, task: asyncio.Task):
+    if not task.cancelled() and task.exception():
+        print(f"  ⚠️  {agent_name} digest failed: {task.exception()}")
+
+
+def schedule_digest(agent_name: str, knowledge: dict, disease: str, api_key: str | None) -> asyncio.Task | None:
+    """Start (or join) the digest for this exact knowledge; None when it is already cached."""
+    if not knowledge.get("updated_at"):
+        return None
+    key = knowledge_hash(disease, agent_name, knowledge)
+    if key in digest_cache:
+        return None
+    task = digest_tasks.get(key)
+    if task is None:
+        task = digest_tasks[key] = asyncio.create_task(_generate_digest(key, agent_name, knowledge, disease, api_key))
+        task.add_done_callback(lambda t, key=key: digest_tasks.pop(key, None))
+        task.add_done_callback(partial(_log_digest_failure, agent_name))
+    return task
+
+
+async def collect_digests(knowledge: dict, disease: str, api_key: str | None) -> tuple[dict[str, str], list[str]]:
+    """Digest per agent for the reduce step, and the agents that fell back to raw knowledge.
+
+    Digests still in flight get DIGEST_GRACE seconds; anything not ready by
+    then is sent raw (cut by whole records) so the reduce never waits on a map call.
+    """
+    pending = [t for agent, k in knowledge.items() if (t := schedule_digest(agent, k, disease, api_key))]
+    if pending:
+        await asyncio.wait(pending, timeout=DIGEST_GRACE)
+    sections, raw = {}, []
+    for agent, k in knowledge.items():
+        if not k.get("updated_at"):
+            continue
+        digest = digest_cache.get(knowledge_hash(disease, agent, k))
+        if digest is None:
+            digest = await run_cpu(fit_knowledge, k, DIGEST_FALLBACK_CHARS)
+            raw.append(agent)
+        sections[agent] = digest
+    return sections, raw
 
 
 # ---------------------------------------------------------------------------
@@ -992,79 +3313,131 @@ class LaunchRequest(BaseModel):
     demo: bool = True
     api_key: str | None = None
     token: str | None = None
+    record: bool = False               # save this mission to a cassette
+    replay: str | None = None          # cassette name to replay instead of calling any API
+    replay_speed: float = 1.0          # replay time scale; 0 = instant
+
 
+AGENT_NAMES = ["scout", "connector", "navigator", "mobilizer",
+               "strategist", "biologist", "chemist", "preclinician"]
 
 current_mission_id = None
 current_api_key: str | None = None  # resolved API key for current mission
 
+
 @app.post("/api/launch")
 async def launch(req: LaunchRequest):
-    """Launch all agents for a mission."""
+    """Launch all agents for a mission, or queue it for an agent worker when BEACON_RUN_MODE=queue."""
     from fastapi.responses import JSONResponse
-    global app_state, shared_plan, current_mission_id, current_api_key
+
+    # --- Replay: recorded mission, no network; it replaces the live mission, so it needs the token ---
+    cassette = None
+    if req.replay:
+        if req.token != BEACON_TOKEN:
+            return JSONResponse(status_code=403, content={"error": "Provide a valid token to replay a recorded mission."})
+        try:
+            cassette = Cassette.load(req.replay, req.replay_speed)
+        except (OSError, ValueError, IndexError) as e:
+            return JSONResponse(status_code=404, content={"error": f"Cassette not found or unreadable: {e}"})
+        req = req.model_copy(update=cassette.header.get("request", {}))
 
     # --- BYOK / token auth ---
     resolved_key: str | None = None
-    if req.token and req.token == BEACON_TOKEN:
+    if cassette:
+        resolved_key = None
+    elif req.token and req.token == BEACON_TOKEN:
         resolved_key = None  # use server's ANTHROPIC_API_KEY (env var)
     elif req.api_key and req.api_key.startswith("sk-ant-"):
         resolved_key = req.api_key
     else:
         return JSONResponse(status_code=403, content={"error": "Provide a valid token or Anthropic API key to launch agents."})
 
-    current_api_key = resolved_key
-
-    import uuid
     mission_id = str(uuid.uuid4())[:8]
+    if RUN_MODE == "queue":
+        if resolved_key is not None:  # workers only hold the server key; a BYOK key is never written to the queue
+            return JSONResponse(status_code=403, content={"error": "This server runs missions in a worker queue; launch with the access token."})
+        await enqueue_mission(mission_id, req)
+        return {"status": "queued", "agents": AGENT_NAMES, "mission_id": mission_id}
+    await start_mission(mission_id, req, resolved_key, cassette)
+    return {"status": "launched", "agents": AGENT_NAMES, "mission_id": mission_id}
+
+
+def new_mission_state(mission_id: str, req: LaunchRequest, stage: str = "launch") -> tuple[dict, dict]:
+    """Fresh (app_state, shared_plan) for a mission."""
+    mission = {
+        "disease": req.disease,
+        "priorities": req.priorities,
+        "journeyStage": req.journeyStage,
+        "patient": req.patient,
+        "location": req.location,
+        "stage": stage,
+        "created_at": datetime.now().isoformat(),
+        "deadline_at": datetime.fromtimestamp(time.time() + MISSION_DEADLINE).isoformat(),
+        "mission_id": mission_id,
+    }
+    state = {
+        "mission": mission,
+        "agents": {name: {"status": "pending", "updates": []} for name in MODELS},
+        "approvals": [],
+    }
+    plan = {
+        "mission": mission,
+        "knowledge": {},
+        "approvals": [],
+        "log": [{"agent": "orchestrator", "timestamp": datetime.now().isoformat(),
+                  "summary": f"Mission initialized for {req.disease}"}],
+    }
+    return state, plan
+
+
+async def start_mission(mission_id: str, req: LaunchRequest, resolved_key: str | None,
+                        cassette: Cassette | None = None) -> asyncio.Task:
+    """Reset state for a new mission and run its agents, synthesis and summaries in a background task."""
+    global app_state, shared_plan, current_mission_id, current_api_key, current_cassette
+    current_api_key = resolved_key
     current_mission_id = mission_id
+    await announce_mission(mission_id)
+    if cassette is None and (req.record or RECORD_MISSIONS):
+        slug = "".join(c if c.isalnum() else "-" for c in req.disease.lower()).strip("-")[:40]
+        cassette = Cassette(CASSETTE_DIR / f"{mission_id}-{slug}.jsonl.gz", "record", {
+            "mission_id": mission_id,
+            "recorded_at": datetime.now().isoformat(),
+            "request": req.model_dump(include={"disease", "priorities", "journeyStage", "patient", "location", "demo"}),
+        })
+    current_cassette = cassette
 
     async with state_lock:
-        # Reset state
-        mission = {
-            "disease": req.disease,
-            "priorities": req.priorities,
-            "journeyStage": req.journeyStage,
-            "patient": req.patient,
-            "location": req.location,
-            "stage": "launch",
-            "created_at": datetime.now().isoformat(),
-            "mission_id": mission_id,
-        }
-        app_state = {
-            "mission": mission,
-            "agents": {name: {"status": "pending", "updates": []} for name in MODELS},
-            "approvals": [],
-        }
-        shared_plan = {
-            "mission": mission,
-            "knowledge": {},
-            "approvals": [],
-            "log": [{"agent": "orchestrator", "timestamp": datetime.now().isoformat(),
-                      "summary": f"Mission initialized for {req.disease}"}],
-        }
+        app_state, shared_plan = new_mission_state(mission_id, req)
+        publish("state", "plan")
+
+    finish_prefetch()
+    start_prefetch(mission_id, req.disease, req.priorities)
 
-    agent_names = ["scout", "connector", "navigator", "mobilizer",
-                    "strategist", "biologist", "chemist", "preclinician"]
+    mission_deadline = time.monotonic() + MISSION_DEADLINE
+    agent_names = AGENT_NAMES
 
     async def run_synthesis():
-        """Extended context synthesis: concatenate all agent outputs and produce unified briefing."""
+        """Reduce step: combine the per-agent digests (built as agents finished) into one family briefing."""
         if current_mission_id != mission_id:
             return
         async with state_lock:
             app_state["synthesis"] = {"status": "running", "result": None}
-            all_knowledge = json.dumps(shared_plan.get("knowledge", {}), indent=1, default=str)
+            publish("state")
+            knowledge = dict(shared_plan.get("knowledge", {}))
             disease = shared_plan.get("mission", {}).get("disease", "the condition")
 
-        token_estimate = len(all_knowledge) // 4  # rough char-to-token ratio
-        print(f"  🧠 Synthesis pass: ~{token_estimate:,} tokens from 8 agents")
+        digests, raw = await collect_digests(knowledge, disease, resolved_key)
+        sections = "\n\n".join(f"=== {agent.upper()}{' (raw data)' if agent in raw else ''} ===\n{text}" for agent, text in digests.items())
+        token_estimate = len(sections) // 4  # rough char-to-token ratio
+        print(f"  🧠 Synthesis reduce: ~{token_estimate:,} tokens from {len(digests)} agents ({len(raw)} undigested)")
 
-        client = anthropic.AsyncAnthropic(**({"api_key": resolved_key} if resolved_key else {}))
         try:
-            response = await client.messages.create(
+            response = await create_message(
+                resolved_key, "synthesis",
                 model="claude-opus-4-6",
                 max_tokens=4096,
                 messages=[{"role": "user", "content": f"""You are the Chief Strategist for a rare disease family support team.
-Below is the complete output from 8 specialist AI agents who have been researching {disease}.
+Below are condensed findings from {len(digests)} specialist AI agents who have been researching {disease}.
 Synthesize ALL findings into a clear, actionable 1-page family briefing with these sections:
 1. **Key Discovery** — The single most important finding
 2. **Treatment Pathways** — Ranked options with status
@@ -1074,8 +3447,8 @@ Synthesize ALL findings into a clear, actionable 1-page family briefing with the
 
 Write for a non-expert family member. Be warm, clear, and action-oriented.
 
-=== AGENT OUTPUTS ({token_estimate:,} tokens) ===
-{all_knowledge[:200000]}"""}],
+=== AGENT FINDINGS ({token_estimate:,} tokens) ===
+{sections}"""}],
             )
             synthesis_text = "\n".join(b.text for b in response.content if b.type == "text")
             async with state_lock:
@@ -1083,83 +3456,184 @@ Write for a non-expert family member. Be warm, clear, and action-oriented.
                     "status": "complete",
                     "result": synthesis_text,
                     "token_count": token_estimate,
+                    "digested": [a for a in digests if a not in raw],
+                    "undigested": raw,
                 }
+                publish("state")
             print(f"  ✅ Synthesis complete")
         except Exception as e:
             traceback.print_exc()
             async with state_lock:
                 app_state["synthesis"] = {"status": "error", "result": str(e)[:200]}
+                publish("state")
 
     async def pre_generate_summaries():
-        """Pre-generate lab summary and researcher briefing after agents complete."""
-        try:
-            from starlette.testclient import TestClient
-        except ImportError:
-            pass
-        # Just call the endpoint functions directly
-        await lab_summary()
-        await researcher_briefing()
+        """Wait for the lab summary and researcher briefing (usually started early by on_agent_settled)."""
+        await asyncio.gather(lab_summary_artifact.get(wait=None), researcher_briefing_artifact.get(wait=None))
         print("  ✅ Lab summaries pre-generated")
 
-    async def run_all():
-        await asyncio.gather(*[run_agent_loop(name, demo=req.demo, mission_id=mission_id, api_key=resolved_key) for name in agent_names])
-        if current_mission_id != mission_id:
-            return  # Mission changed, skip synthesis
-        # Run synthesis and pre-generate summaries in parallel
-        await asyncio.gather(run_synthesis(), pre_generate_summaries())
-        if current_mission_id == mission_id:
-            async with state_lock:
-                app_state["mission"]["stage"] = "roadmap"
+    async def run_agent_traced(name: str):
+        with span("agent", agent=name):
+            await run_agent_loop(name, demo=req.demo, mission_id=mission_id, api_key=resolved_key, deadline=mission_deadline)
 
-    asyncio.create_task(run_all())
-    return {"status": "launched", "agents": agent_names}
+    async def run_all():
+        ACTIVE_MISSIONS.inc()
+        try:
+            with span("agents"):
+                await asyncio.gather(*[run_agent_traced(name) for name in agent_names])
+            finish_prefetch(mission_id)
+            if current_mission_id != mission_id:
+                return  # Mission changed, skip synthesis
+            # Run synthesis and pre-generate summaries in parallel
+            with span("post_processing"):
+                await asyncio.gather(run_synthesis(), pre_generate_summaries())
+            if current_mission_id == mission_id:
+                async with state_lock:
+                    app_state["mission"]["stage"] = "roadmap"
+                    publish("state", "plan")
+        finally:
+            ACTIVE_MISSIONS.dec()
+            if cassette and cassette.mode == "record":
+                cassette.save()
+
+    async def run_all_traced():
+        with span("mission", trace_id=mission_id, disease=req.disease, demo=req.demo):
+            await run_all()
+
+    return asyncio.create_task(run_all_traced())
 
 
 @app.get("/api/state")
-async def get_state():
-    async with state_lock:
-        return app_state
+async def get_state(request: Request):
+    return await snapshot_response("state", request)
 
 
 @app.get("/api/plan")
-async def get_plan():
-    async with state_lock:
-        return shared_plan
+async def get_plan(request: Request):
+    return await snapshot_response("plan", request)
 
 
-lab_summary_cache = {"mission_id": None, "result": None, "status": "idle"}
+@app.get("/api/events")
+async def events():
+    """Server-sent events: one `state` / `plan` event (with its ETag) per published change, from any worker."""
+    from fastapi.responses import StreamingResponse
 
-@app.get("/api/lab-summary")
-async def lab_summary():
-    """Generate a family-friendly summary of the Drug Discovery Lab findings."""
-    global lab_summary_cache
+    async def stream():
+        yield ": connected\n\n"
+        async for message in state_bus.subscribe("events"):
+            change = json_loads(message)
+            yield f"event: {change['name']}\ndata: {message.decode()}\n\n"
 
-    # Return cached if same mission
-    if lab_summary_cache["mission_id"] == current_mission_id and lab_summary_cache["result"]:
-        return lab_summary_cache
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
 
-    # Check if lab agents have data
-    async with state_lock:
-        knowledge = shared_plan.get("knowledge", {})
-        disease = shared_plan.get("mission", {}).get("disease", "the condition")
 
-    bio = knowledge.get("biologist", {})
-    chem = knowledge.get("chemist", {})
-    prec = knowledge.get("preclinician", {})
+# Generated artifacts (lab summary, researcher briefing)
 
-    if not bio.get("targets") and not chem.get("repurposing_candidates"):
-        return {"status": "waiting", "result": None, "mission_id": current_mission_id}
+ARTIFACT_WAIT_MAX = 30.0  # longest a single long-poll request may hold the connection
 
-    lab_summary_cache = {"mission_id": current_mission_id, "result": None, "status": "generating"}
 
-    lab_data = json.dumps({"biologist": bio, "chemist": chem, "preclinician": prec}, indent=1, default=str)[:50000]
+class Artifact:
+    """An LLM-written document derived from a few knowledge sections.
 
-    client = anthropic.AsyncAnthropic(**({"api_key": current_api_key} if current_api_key else {}))
-    try:
-        response = await client.messages.create(
-            model="claude-sonnet-4-5-20250929",
-            max_tokens=1500,
-            messages=[{"role": "user", "content": f"""You are writing for a family member (non-scientist) whose child has {disease}.
+    Generation is single-flight per (mission, input version): every caller
+    asking for the same version shares one background task, and any change
+    to an input section makes the cached result stale so the next request
+    regenerates it. Callers may long-poll with `wait` instead of re-polling.
+    """
+
+    def __init__(self, name: str, sections: tuple[str, ...], ready, generate, unavailable: str):
+        self.name = name
+        self.sections = sections
+        self.ready = ready
+        self.generate = generate
+        self.unavailable = unavailable
+        self.mission_id: str | None = None
+        self.version: str | None = None
+        self.status = "idle"
+        self.result: str | None = None
+        self.task: asyncio.Task | None = None
+
+    def input_version(self, knowledge: dict) -> str:
+        content = {s: {k: v for k, v in knowledge.get(s, {}).items() if k != "updated_at"} for s in self.sections}
+        return hashlib.sha1(dumps_bytes(content)).hexdigest()[:12]
+
+    def view(self) -> dict:
+        return {"status": self.status, "result": self.result, "mission_id": self.mission_id, "version": self.version}
+
+    async def get(self, wait: float | None = 0) -> dict:
+        """Current result, starting generation for the latest inputs if needed.
+
+        wait: seconds to hold for a running generation (None = until done).
+        """
+        if state_bus.shared and mission_owner not in (None, BOOT_ID):
+            return await self._remote_view(wait)
+        async with state_lock:
+            knowledge = {s: shared_plan.get("knowledge", {}).get(s, {}) for s in self.sections}
+            disease = shared_plan.get("mission", {}).get("disease", "the condition")
+            mission_id = current_mission_id
+        if not self.ready(knowledge):
+            return {"status": "waiting", "result": None, "mission_id": mission_id}
+
+        version = await run_cpu(self.input_version, knowledge)
+        if (self.mission_id, self.version) != (mission_id, version):
+            self._start(mission_id, version, knowledge, disease)
+        if self.task and not self.task.done() and (wait is None or wait > 0):
+            await asyncio.wait({self.task}, timeout=wait)
+        return self.view()
+
+    def _start(self, mission_id: str | None, version: str, knowledge: dict, disease: str):
+        if self.task and not self.task.done():
+            self.task.cancel()  # inputs changed underneath it; its result would be stale
+        self.mission_id, self.version = mission_id, version
+        self.status, self.result = "generating", None
+        self._share()
+        self.task = asyncio.create_task(self._run(mission_id, version, knowledge, disease))
+
+    async def _run(self, mission_id: str | None, version: str, knowledge: dict, disease: str):
+        with span("artifact", artifact=self.name, version=version):
+            try:
+                result, status = await self.generate(knowledge, disease), "complete"
+            except Exception as e:
+                traceback.print_exc()
+                result, status = f"{self.unavailable}: {str(e)[:100]}", "error"
+        if (self.mission_id, self.version) == (mission_id, version):
+            self.status, self.result = status, result
+            self._share()
+
+    def _share(self):
+        """Mirror the current view onto the state bus for workers that don't run the mission."""
+        if state_bus.shared:
+            view = dumps_bytes(self.view())
+            asyncio.create_task(state_bus.set(f"artifact:{self.name}", view))
+            asyncio.create_task(state_bus.publish(f"artifact:{self.name}", view))
+
+    async def _remote_view(self, wait: float | None) -> dict:
+        """The owning worker's view, long-polled over the bus while it is still generating."""
+        stored = await state_bus.get(f"artifact:{self.name}")
+        view = json_loads(stored) if stored else None
+        if view is None or view.get("mission_id") != current_mission_id:
+            view = {"status": "waiting", "result": None, "mission_id": current_mission_id}
+        if view["status"] in ("complete", "error") or wait == 0:
+            return view
+        try:
+            async with asyncio.timeout(wait):
+                async for message in state_bus.subscribe(f"artifact:{self.name}"):
+                    view = json_loads(message)
+                    if view["status"] in ("complete", "error"):
+                        break
+        except TimeoutError:
+            pass
+        return view
+
+
+async def generate_lab_summary(knowledge: dict, disease: str) -> str:
+    """Family-friendly summary of the Drug Discovery Lab findings."""
+    lab_data = (await run_cpu(dumps_text, knowledge))[:50000]
+    response = await create_message(
+        current_api_key, "lab_summary",
+        model="claude-sonnet-4-5-20250929",
+        max_tokens=1500,
+        messages=[{"role": "user", "content": f"""You are writing for a family member (non-scientist) whose child has {disease}.
 
 Below is technical data from our Drug Discovery Lab agents (biologist, chemist, preclinician) about potential treatments.
 
@@ -1173,82 +3647,253 @@ Keep it under 300 words. No jargon. No markdown headers. Write as if you're a ki
 
 === LAB DATA ===
 {lab_data}"""}],
-        )
-        result = "\n".join(b.text for b in response.content if b.type == "text")
-        lab_summary_cache = {"mission_id": current_mission_id, "result": result, "status": "complete"}
-    except Exception as e:
-        traceback.print_exc()
-        lab_summary_cache = {"mission_id": current_mission_id, "result": f"Summary unavailable: {str(e)[:100]}", "status": "error"}
+    )
+    return "\n".join(b.text for b in response.content if b.type == "text")
+
+
+async def generate_researcher_briefing(knowledge: dict, disease: str) -> str:
+    """Technical briefing a family can forward to a researcher identified by Connector."""
+    all_data = (await run_cpu(dumps_text, knowledge))[:60000]
+    response = await create_message(
+        current_api_key, "researcher_briefing",
+        model="claude-sonnet-4-5-20250929",
+        max_tokens=2000,
+        messages=[{"role": "user", "content": f"""Write a professional research briefing document about {disease} that a patient's family can forward to a researcher or specialist they've been connected with.
+
+The briefing should:
+1. Open with a concise clinical summary of the patient's condition ({disease})
+2. Summarize the computational drug discovery analysis performed (targets identified, compounds screened, top candidates)
+3. Present the top 2-3 drug repurposing candidates with their mechanisms, evidence, and safety profiles
+4. Include relevant clinical trial matches
+5. End with specific questions the family would like the researcher's input on
+
+Write in professional scientific language appropriate for a PhD/MD researcher. Include data points (pChEMBL values, IC50s, gene names) where available. Format with clear sections.
+
+Start with: "RESEARCH BRIEFING: {disease} — Computational Drug Discovery Analysis"
+
+=== AGENT DATA ===
+{all_data}"""}],
+    )
+    return "\n".join(b.text for b in response.content if b.type == "text")
+
+
+lab_summary_artifact = Artifact(
+    "lab_summary", ("biologist", "chemist", "preclinician"),
+    ready=lambda k: bool(k["biologist"].get("targets") or k["chemist"].get("repurposing_candidates")),
+    generate=generate_lab_summary,
+    unavailable="Summary unavailable",
+)
+researcher_briefing_artifact = Artifact(
+    "researcher_briefing", ("scout", "biologist", "chemist", "preclinician", "connector"),
+    ready=lambda k: bool(k["biologist"].get("targets") or k["scout"].get("findings")),
+    generate=generate_researcher_briefing,
+    unavailable="Briefing unavailable",
+)
+
+ARTIFACTS = (lab_summary_artifact, researcher_briefing_artifact)
+
 
-    return lab_summary_cache
+def agent_settled(agent_name: str) -> bool:
+    return app_state["agents"].get(agent_name, {}).get("status") in ("complete", "error")
 
 
-researcher_briefing_cache = {"mission_id": None, "result": None, "status": "idle"}
+def on_agent_settled(agent_name: str, api_key: str | None):
+    """Start every derived artifact whose input sections have all settled.
+
+    Runs when an agent finishes (or fails), so the synthesis digest for that
+    agent and any artifact depending only on finished agents start right
+    away instead of waiting for the whole mission.
+    """
+    schedule_digest(agent_name, shared_plan["knowledge"].get(agent_name, {}), shared_plan["mission"].get("disease", ""), api_key)
+    for artifact in ARTIFACTS:
+        if agent_name in artifact.sections and all(agent_settled(s) for s in artifact.sections):
+            print(f"  ⚡ Inputs ready for {artifact.name}, generating early")
+            asyncio.create_task(artifact.get())
+
+
+@app.get("/api/lab-summary")
+async def lab_summary(wait: float = 0):
+    """Generate a family-friendly summary of the Drug Discovery Lab findings.
+
+    Pass ?wait=N (up to ARTIFACT_WAIT_MAX seconds) to long-poll a running generation.
+    """
+    return await lab_summary_artifact.get(min(max(wait, 0), ARTIFACT_WAIT_MAX))
+
 
 @app.get("/api/researcher-briefing")
-async def researcher_briefing():
+async def researcher_briefing(wait: float = 0):
     """Generate a technical briefing a family can forward to a researcher identified by Connector."""
-    global researcher_briefing_cache
+    return await researcher_briefing_artifact.get(min(max(wait, 0), ARTIFACT_WAIT_MAX))
 
-    if researcher_briefing_cache["mission_id"] == current_mission_id and researcher_briefing_cache["result"]:
-        return researcher_briefing_cache
 
-    async with state_lock:
-        knowledge = shared_plan.get("knowledge", {})
-        disease = shared_plan.get("mission", {}).get("disease", "the condition")
+class ApprovalUpdate(BaseModel):
+    note: str = ""
+
+
+@app.get("/api/approvals")
+async def list_approvals(status: str | None = None, agent: str | None = None, type: str | None = None,
+                         offset: int = 0, limit: int = 50):
+    """Approvals for the current mission, oldest first, filterable by status, agent and type."""
+    from fastapi.responses import JSONResponse
+    if status and status not in APPROVAL_STATUSES:
+        return JSONResponse(status_code=400, content={"error": f"status must be one of {', '.join(APPROVAL_STATUSES)}"})
+    store = await remote_approvals() if state_bus.shared and mission_owner not in (None, BOOT_ID) else current_approvals()
+    return store.page(status, agent, type, max(0, offset), max(1, min(limit, APPROVAL_PAGE_MAX)))
 
-    bio = knowledge.get("biologist", {})
-    chem = knowledge.get("chemist", {})
-    prec = knowledge.get("preclinician", {})
-    scout = knowledge.get("scout", {})
-    connector = knowledge.get("connector", {})
 
-    if not bio.get("targets") and not scout.get("findings"):
-        return {"status": "waiting", "result": None, "mission_id": current_mission_id}
+@app.post("/api/approvals/{approval_id}/{action}")
+async def update_approval(approval_id: str, action: str, update: ApprovalUpdate | None = None):
+    """Approve, reject or defer one approval item."""
+    from fastapi.responses import JSONResponse
+    status = APPROVAL_ACTIONS.get(action)
+    if status is None:
+        return JSONResponse(status_code=404, content={"error": f"Unknown action {action} (use {', '.join(APPROVAL_ACTIONS)})"})
+    note = update.note if update else ""
+    if state_bus.shared and mission_owner not in (None, BOOT_ID):
+        # Another worker runs the mission: check the id against its published plan and hand the update over
+        record = (await remote_approvals()).get(approval_id)
+        if record is not None:
+            await state_bus.publish("approvals", dumps_bytes({"mission_id": current_mission_id, "id": approval_id,
+                                                              "status": status, "note": note}))
+            record = {**record, "status": status, **({"note": note} if note else {})}
+    else:
+        record = await set_approval_status(approval_id, status, note)
+    if record is None:
+        return JSONResponse(status_code=404, content={"error": f"No approval {approval_id} in the current mission"})
+    return record
 
-    researcher_briefing_cache = {"mission_id": current_mission_id, "result": None, "status": "generating"}
 
-    all_data = json.dumps({"scout": scout, "biologist": bio, "chemist": chem, "preclinician": prec, "connector": connector}, indent=1, default=str)[:60000]
+@app.get("/api/metrics")
+async def metrics():
+    """Prometheus text exposition of tool, upstream, LLM, iteration and lock metrics."""
+    from fastapi.responses import PlainTextResponse
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
 
-    client = anthropic.AsyncAnthropic(**({"api_key": current_api_key} if current_api_key else {}))
-    try:
-        response = await client.messages.create(
-            model="claude-sonnet-4-5-20250929",
-            max_tokens=2000,
-            messages=[{"role": "user", "content": f"""Write a professional research briefing document about {disease} that a patient's family can forward to a researcher or specialist they've been connected with.
 
-The briefing should:
-1. Open with a concise clinical summary of the patient's condition ({disease})
-2. Summarize the computational drug discovery analysis performed (targets identified, compounds screened, top candidates)
-3. Present the top 2-3 drug repurposing candidates with their mechanisms, evidence, and safety profiles
-4. Include relevant clinical trial matches
-5. End with specific questions the family would like the researcher's input on
+@app.get("/api/traces/{mission_id}")
+async def get_trace(mission_id: str):
+    """Finished spans for a mission plus the span ids on its critical path."""
+    spans = load_trace(mission_id)
+    return {"mission_id": mission_id, "spans": spans, "critical_path": critical_path(spans)}
 
-Write in professional scientific language appropriate for a PhD/MD researcher. Include data points (pChEMBL values, IC50s, gene names) where available. Format with clear sections.
 
-Start with: "RESEARCH BRIEFING: {disease} — Computational Drug Discovery Analysis"
+@app.get("/api/traces/{mission_id}/waterfall")
+async def get_trace_waterfall(mission_id: str):
+    """HTML waterfall of a mission's spans with the critical path highlighted."""
+    from fastapi.responses import HTMLResponse
+    return HTMLResponse(render_waterfall(mission_id, load_trace(mission_id)))
 
-=== AGENT DATA ===
-{all_data}"""}],
-        )
-        result = "\n".join(b.text for b in response.content if b.type == "text")
-        researcher_briefing_cache = {"mission_id": current_mission_id, "result": result, "status": "complete"}
-    except Exception as e:
-        traceback.print_exc()
-        researcher_briefing_cache = {"mission_id": current_mission_id, "result": f"Briefing unavailable: {str(e)[:100]}", "status": "error"}
 
-    return researcher_briefing_cache
+@app.get("/api/cassettes")
+async def cassettes(token: str | None = None):
+    """Recorded missions available for replay via /api/launch {"replay": name, "token": ...}."""
+    from fastapi.responses import JSONResponse
+
+    if token != BEACON_TOKEN:
+        return JSONResponse(status_code=403, content={"error": "Provide a valid token to list recorded missions."})
+    return {"cassettes": list_cassettes()}
 
 
 @app.get("/api/health")
 async def health():
-    return {"status": "ok", "tools": len(mcp_tool_schemas)}
+    return {"status": "ok", "tools": len(mcp_tool_schemas), "tool_calls": tool_call_stats, "prefetch": prefetch_stats,
+            "model_cascade": cascade_rates(), "anthropic_clients": anthropic_pool.status(),
+            "upstreams": {name: b.status() for name, b in breakers.items()}, "event_loop": loop_lag_stats,
+            "admission": {"agents": agent_slots.status(), "llm": llm_slots.status()}, "run_mode": RUN_MODE, "jobs": await state_bus.job_counts() if RUN_MODE == "queue" else None}
+
+
+# ---------------------------------------------------------------------------
+# Agent workers (BEACON_RUN_MODE=queue: the API enqueues, `python main.py worker` runs missions)
+# ---------------------------------------------------------------------------
+
+RUN_MODE = os.environ.get("BEACON_RUN_MODE", "inline")  # "inline" (the API process runs agents) or "queue"
+JOB_POLL_INTERVAL = 0.5
+JOB_HEARTBEAT = 10.0
+JOB_LEASE = 60.0       # a running job without a heartbeat for this long is taken over by another worker
+JOB_MAX_ATTEMPTS = 2
+
+
+async def enqueue_mission(mission_id: str, req: LaunchRequest):
+    """Queue a mission for the agent workers and publish a "queued" placeholder until one picks it up.
+
+    Queued missions run on the workers' ANTHROPIC_API_KEY; credentials are never stored in the job.
+    """
+    global current_mission_id
+    current_mission_id = mission_id
+    state, plan = new_mission_state(mission_id, req, stage="queued")
+    for name, obj in (("state", state), ("plan", plan)):
+        await state_bus.set(f"snapshot:{name}", f'"queued-{mission_id}-{name}"'.encode() + b"\n" + dumps_bytes(obj))
+    await announce_mission(mission_id, owner="queue")
+    payload = {"mission_id": mission_id, "request": req.model_dump(exclude={"api_key", "token"})}
+    job_id = await state_bus.enqueue_job(dumps_bytes(payload))
+    print(f"  📥 Mission {mission_id} queued as job {job_id}")
+
+
+async def run_job(job_id: int, payload: bytes, attempt: int):
+    """Run one claimed mission to completion, heartbeating so a crashed worker's job can be taken over."""
+    status = "failed"
+    try:
+        job = json_loads(payload)
+        req = LaunchRequest(**job["request"])
+        cassette = Cassette.load(req.replay, req.replay_speed) if req.replay else None
+        print(f"👷 Worker {BOOT_ID} running mission {job['mission_id']} (job {job_id}, attempt {attempt})")
+        task = await start_mission(job["mission_id"], req, None, cassette)
+        while not (await asyncio.wait({task}, timeout=JOB_HEARTBEAT))[0]:
+            await state_bus.heartbeat_job(job_id, BOOT_ID)
+        task.result()
+        status = "done" if current_mission_id == job["mission_id"] else "superseded"
+    except Exception:
+        traceback.print_exc()
+    finally:
+        await state_bus.finish_job(job_id, status)
+
+
+async def run_worker():
+    """Agent worker loop: claim queued missions from the state bus and run them. Start as many as needed."""
+    if not state_bus.shared:
+        raise SystemExit("Agent workers need a shared BEACON_STATE_BACKEND (e.g. sqlite:///path/to/state.db)")
+    await start_background_tasks()
+    await discover_all_tools()
+    print(f"👷 Agent worker {BOOT_ID} waiting for missions")
+    jobs: set[asyncio.Task] = set()
+    while True:
+        claimed = await state_bus.claim_job(BOOT_ID, JOB_LEASE)
+        if claimed is None:
+            await asyncio.sleep(JOB_POLL_INTERVAL)
+            continue
+        task = asyncio.create_task(run_job(*claimed))
+        jobs.add(task)
+        task.add_done_callback(jobs.discard)
 
 
 # ---------------------------------------------------------------------------
 # Startup
 # ---------------------------------------------------------------------------
 
+async def start_background_tasks():
+    asyncio.create_task(monitor_event_loop())
+    asyncio.create_task(sync_state())
+    if state_bus.shared:
+        asyncio.create_task(follow_missions())
+        asyncio.create_task(follow_approval_updates())
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    flush_traces()
+
+
 @app.on_event("startup")
 async def startup():
-    await discover_all_tools()
+    if RUN_MODE == "queue" and not state_bus.shared:
+        raise RuntimeError("BEACON_RUN_MODE=queue needs a shared BEACON_STATE_BACKEND (e.g. sqlite:///path/to/state.db)")
+    await start_background_tasks()
+    if RUN_MODE != "queue":  # tools are only called by the agents, which run in the workers
+        await discover_all_tools()
+
+
+if __name__ == "__main__":
+    import sys
+    if sys.argv[1:] != ["worker"]:
+        raise SystemExit("usage: python main.py worker  (the API itself runs under uvicorn)")
+    asyncio.run(run_worker())
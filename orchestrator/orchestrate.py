@@ -3,6 +3,7 @@
 
 import asyncio
 import fcntl
+import hashlib
 import json
 import os
 import sys
@@ -94,6 +95,25 @@ MCP_TOOLS = {
 }
 
 
+def approval_key(item):
+    """Content hash used to drop approval items an agent re-proposes in a later iteration."""
+    identity = {k: item.get(k) for k in ("type", "title", "content")}
+    return hashlib.sha1(json.dumps(identity, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def add_approvals(queue, agent_name, items):
+    """Append the items not already in `queue` (by content); returns how many were new."""
+    known = {approval_key(a) for a in queue}
+    added = 0
+    for item in items:
+        key = approval_key(item)
+        if key not in known:
+            known.add(key)
+            queue.append({**item, "agent": item.get("agent") or agent_name})
+            added += 1
+    return added
+
+
 def load_state():
     with open(STATE_FILE) as f:
         return json.load(f)
@@ -349,16 +369,14 @@ def merge_output(agent_name, raw_output):
     # Handle approval items
     approval_items = data.get("approvalItems", [])
     if approval_items:
-        plan["approvals"].extend(approval_items)
+        add_approvals(plan["approvals"], agent_name, approval_items)
         state = load_state()
-        approvals = state.get("approvals", state.get("approvalQueue", []))
-        approvals.extend(approval_items)
-        if "approvals" in state:
-            state["approvals"] = approvals
-        else:
-            state["approvalQueue"] = approvals
+        # The dashboard reads approvalQueue; fold in the "approvals" key older runs wrote
+        queue = state.setdefault("approvalQueue", [])
+        add_approvals(queue, agent_name, state.pop("approvals", []))
+        added = add_approvals(queue, agent_name, approval_items)
         save_state(state)
-        print(f"     📋 {len(approval_items)} items added to approval queue")
+        print(f"     📋 {added} new items added to approval queue")
 
     # Log the update
     plan["log"].append({